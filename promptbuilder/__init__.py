@@ -5,9 +5,20 @@ from loguru import logger
 # Fixes Observation a: Update version for RC-1
 __version__ = "0.2.0-rc1"
 
+_plugins_loaded = False
+
 # Centralized plugin loading
-def _initialize_plugins():
-    """Loads plugins unless explicitly skipped."""
+def ensure_plugins_loaded():
+    """
+    Loads plugins unless explicitly skipped. Idempotent, so callers that need
+    plugin-provided features can call it on demand instead of paying for entry
+    point discovery on every import.
+    """
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+
     # Allow skipping plugin loading for tests or specific environments
     if os.environ.get("PROMPTBUILDER_SKIP_PLUGINS", "0") == "1":
         logger.info("Skipping plugin loading due to PROMPTBUILDER_SKIP_PLUGINS=1.")
@@ -18,8 +29,6 @@ def _initialize_plugins():
         load_plugins() # Discover and register plugins from entry points
     except ImportError as e:
          # This might happen if core modules are not yet available during partial imports
-         logger.warning(f"Could not load plugins during initial import: {e}")
+         logger.warning(f"Could not load plugins: {e}")
     except Exception as e:
         logger.exception("An unexpected error occurred during plugin loading.")
-
-_initialize_plugins()
\ No newline at end of file
@@ -1,8 +1,9 @@
 # promptbuilder/cli.py
 
-import fnmatch # Import fnmatch for pattern matching
+import os
+import stat
 from pathlib import Path
-from typing import Optional, List, Set, Dict # Added Set, Dict
+from typing import Optional, List, Set, Dict, Tuple # Added Set, Dict
 
 import typer
 from loguru import logger
@@ -14,13 +15,13 @@ from .services.logging import setup_logging
 # --- Import core components (now decoupled) ---
 from .config.loader import get_config
 # Import the *core* classes, not the Qt adapters
-from .core.fs_scanner import _FileScannerCore
+from .core.fs_scanner import _FileScannerCore, compile_glob_matcher
 from .core.prompt_engine import PromptEngine
 from .core.context_assembler import _ContextAssemblerCore
 from .core.models import FileNode
-from . import __version__
+from . import __version__, ensure_plugins_loaded
 
-# Plugins are loaded via __init__
+# Plugins are loaded on demand via ensure_plugins_loaded()
 
 # --- Typer App ---
 app = typer.Typer(help="PromptBuilder CLI - Generate prompts headlessly (Windows).")
@@ -36,15 +37,56 @@ def main_options(
     verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable debug logging."),
     version: Optional[bool] = typer.Option(None, "--version", callback=version_callback, is_eager=True, help="Show version and exit."),
 ):
-    """ Main callback to set up logging """
-    log_level = "DEBUG" if verbose else "INFO"
-    # Configure logging here, after flags are parsed
-    setup_logging(level=log_level, verbose=verbose)
-    logger.info(f"Log level set to: {log_level}")
+    """ Main callback to record global options """
+    # Logging is configured by the command itself (see _init_logging), so --help on a
+    # subcommand doesn't pay for sink setup
     ctx.ensure_object(dict)
     ctx.obj["VERBOSE"] = verbose
 
 
+def _init_logging(ctx: typer.Context) -> None:
+    """Configures logging once a command body actually runs."""
+    verbose = bool((ctx.obj or {}).get("VERBOSE", False))
+    log_level = "DEBUG" if verbose else "INFO"
+    setup_logging(level=log_level, verbose=verbose)
+    logger.debug("Log level set to: {}", log_level)
+
+
+def _flatten(nodes: List[FileNode], root_path: Path) -> Tuple[List[FileNode], List[int], List[str]]:
+    """
+    Flattens the trees under `nodes` into pre-order arrays, so later passes are
+    linear sweeps instead of pointer-chasing walks.
+
+    Returns:
+        (flat_nodes, parent_idx, rel_paths): parent_idx[i] is the index of node i's
+        parent in flat_nodes (-1 for the input nodes); parents always precede children.
+    """
+    flat_nodes: List[FileNode] = []
+    parent_idx: List[int] = []
+    rel_paths: List[str] = []
+    stack: List[Tuple[FileNode, int]] = [(node, -1) for node in reversed(nodes)]
+
+    while stack:
+        node, parent = stack.pop()
+        idx = len(flat_nodes)
+        flat_nodes.append(node)
+        parent_idx.append(parent)
+
+        # The scanner records each node's root-relative path; only recompute for nodes without one
+        relative_path = node.rel_path
+        if not relative_path:
+            try:
+                relative_path = node.path.relative_to(root_path).as_posix()
+            except ValueError:
+                relative_path = node.name # Fallback
+        rel_paths.append(relative_path)
+
+        if node.is_dir:
+            stack.extend((child, idx) for child in reversed(node.children))
+
+    return flat_nodes, parent_idx, rel_paths
+
+
 def _filter_nodes(
     nodes: List[FileNode],
     root_path: Path,
@@ -71,132 +113,46 @@ def _filter_nodes(
     if not include_patterns and not exclude_patterns:
         return nodes # No filtering needed
 
-    kept_paths: Set[Path] = set() # Store paths of nodes that should be kept
-
-    # --- Inclusion Pass ---
-    nodes_to_consider = nodes
-    if include_patterns:
-        logger.debug(f"Applying include patterns: {include_patterns}")
-        included_paths_pass1: Set[Path] = set()
-        # Use a stack for iterative traversal of the initial node list and their children
-        stack: List[FileNode] = list(nodes_to_consider)
-        processed_for_include: Set[Path] = set() # Avoid reprocessing nodes
-
-        while stack:
-            node = stack.pop()
-            if node.path in processed_for_include: continue
-            processed_for_include.add(node.path)
-
-            try:
-                relative_path = node.path.relative_to(root_path).as_posix()
-            except ValueError:
-                relative_path = node.name # Fallback
-
-            is_match = False
-            for pattern in include_patterns:
-                if fnmatch.fnmatch(relative_path, pattern) or fnmatch.fnmatch(node.name, pattern):
-                    is_match = True
-                    break
-
-            if is_match:
-                # If a node matches, keep it and ensure all its parents are also marked
-                curr = node
-                while curr is not None:
-                    if curr.path in included_paths_pass1: break # Already marked up this branch
-                    included_paths_pass1.add(curr.path)
-                    curr = curr.parent
-            # Always traverse children, regardless of parent match status,
-            # as a child might match an include pattern even if the parent doesn't.
-            if node.is_dir:
-                stack.extend(node.children) # Add children to the stack
-
-        kept_paths = included_paths_pass1
-        logger.info(f"Include pass identified {len(kept_paths)} potential paths.")
-    else:
-        # No include patterns: initially consider all paths from the input nodes and their descendants
-        stack = list(nodes)
-        all_paths: Set[Path] = set()
-        processed_all: Set[Path] = set()
-        while stack:
-             node = stack.pop()
-             if node.path in processed_all: continue
-             processed_all.add(node.path)
-             all_paths.add(node.path)
-             if node.is_dir: stack.extend(node.children)
-        kept_paths = all_paths
-        logger.info("No include patterns, considering all scanned paths initially.")
-
-
-    # --- Exclusion Pass ---
-    if exclude_patterns:
-        logger.debug(f"Applying exclude patterns: {exclude_patterns}")
-        paths_to_exclude: Set[Path] = set()
-        # Check all potentially kept paths against exclusion rules
-        # Iterate through all original nodes again to check patterns
-        stack = list(nodes)
-        processed_for_exclude: Set[Path] = set()
-
-        while stack:
-             node = stack.pop()
-             if node.path in processed_for_exclude: continue
-             processed_for_exclude.add(node.path)
-
-             # Only check nodes that were potentially kept by the include pass
-             if node.path not in kept_paths:
-                  if node.is_dir: stack.extend(node.children) # Still need to check children
-                  continue
-
-             try:
-                relative_path = node.path.relative_to(root_path).as_posix()
-             except ValueError:
-                relative_path = node.name
-
-             is_excluded = False
-             for pattern in exclude_patterns:
-                 if fnmatch.fnmatch(relative_path, pattern) or fnmatch.fnmatch(node.name, pattern):
-                     is_excluded = True
-                     break
-
-             if is_excluded:
-                 # If a node is excluded, mark it and all its descendants for removal
-                 exclusion_stack = [node]
-                 processed_exclusion_stack: Set[Path] = set()
-                 while exclusion_stack:
-                      ex_node = exclusion_stack.pop()
-                      if ex_node.path in processed_exclusion_stack: continue
-                      processed_exclusion_stack.add(ex_node.path)
-
-                      paths_to_exclude.add(ex_node.path)
-                      if ex_node.is_dir: exclusion_stack.extend(ex_node.children)
-             elif node.is_dir: # If directory not excluded, check its children
-                  stack.extend(node.children)
-
-        # Remove excluded paths
-        final_kept_paths = kept_paths - paths_to_exclude
-        logger.info(f"Exclude pass removed {len(paths_to_exclude)} paths. Keeping {len(final_kept_paths)}.")
-        kept_paths = final_kept_paths
-
-
-    # --- Collect the actual FileNode objects corresponding to kept paths ---
+    # Compile once; basename-only and path globs are split so each is tested against one string
+    include_matcher = compile_glob_matcher(include_patterns)
+    exclude_matcher = compile_glob_matcher(exclude_patterns)
+    logger.debug("Applying include patterns: {}, exclude patterns: {}", include_patterns, exclude_patterns)
+
+    flat_nodes, parent_idx, rel_paths = _flatten(nodes, root_path)
+    n = len(flat_nodes)
+
+    # Per-node flags live in bytearrays indexed by flat position (1 byte/node, no hashing).
+    # Exclude sweep (forward): parents precede children, so an excluded ancestor is
+    # already flagged by the time its descendants are visited.
+    excluded = bytearray(n)
+    excluded_count = 0
+    if exclude_matcher:
+        for i in range(n):
+            p = parent_idx[i]
+            if p >= 0 and excluded[p]:
+                excluded[i] = 1
+            elif exclude_matcher.matches(rel_paths[i], flat_nodes[i].name):
+                excluded[i] = 1
+                excluded_count += 1
+
+    # Include sweep + keep propagation (backward, i.e. post-order): a node is kept if it
+    # isn't excluded and either a child already marked it or it matches the include
+    # patterns (or there are none); kept nodes then OR their bit into the parent.
+    # Nodes already marked by a child skip the pattern test entirely.
+    kept = bytearray(n)
+    for i in range(n - 1, -1, -1):
+        if excluded[i]:
+            continue
+        if kept[i] or not include_matcher or include_matcher.matches(rel_paths[i], flat_nodes[i].name):
+            kept[i] = 1
+            p = parent_idx[i]
+            if p >= 0:
+                kept[p] = 1
+
+    filtered_nodes_flat = [flat_nodes[i] for i in range(n) if kept[i]]
+    logger.info("Filter kept {} paths ({} subtrees excluded).", len(filtered_nodes_flat), excluded_count)
     # Fixes regression #2: Clarify that this returns a flat list.
     # The reconstruction of the tree is complex and not needed by the current caller.
-    filtered_nodes_flat: List[FileNode] = []
-    stack = list(nodes)
-    processed_final: Set[Path] = set()
-    while stack:
-         node = stack.pop()
-         if node.path in processed_final: continue
-         processed_final.add(node.path)
-
-         if node.path in kept_paths:
-              # Add the node itself to the flat list if its path was kept
-              filtered_nodes_flat.append(node)
-
-         # Always traverse children, as a child might be kept even if parent wasn't initially added
-         # (e.g., parent excluded, but child included by a more specific rule - though current logic might not handle this perfectly)
-         if node.is_dir: stack.extend(node.children)
-
-    logger.debug(f"Filter function returning flat list of {len(filtered_nodes_flat)} kept nodes.")
     return filtered_nodes_flat
 
 
@@ -204,33 +160,32 @@ def _collect_paths_from_nodes(nodes: List[FileNode]) -> Set[Path]:
     """
     Helper to recursively extract all *file* paths from a flat list of FileNode objects.
     It traverses directories found in the list to find nested files.
+
+    Nodes must come from a tree (no shared subtrees). The list itself may overlap,
+    e.g. _filter_nodes returns a directory alongside its kept descendants, so
+    directories are expanded at most once, tracked by id() rather than by hashing Paths.
     """
     paths: Set[Path] = set()
-    # Use a stack and track visited directories to handle potential duplicates if
-    # the input list contains both a directory and its children.
     stack = list(nodes)
-    visited_nodes : Set[Path] = set()
+    expanded_dirs: Set[int] = set()
 
     while stack:
         node = stack.pop()
-        if node.path in visited_nodes: continue
-        visited_nodes.add(node.path)
-
         if not node.is_dir:
-            paths.add(node.path)
-        else:
-             # If it's a directory, add its direct children to the stack to process them.
-             # This ensures we find files within directories present in the input list.
-             stack.extend(node.children)
+            paths.add(node.path) # Duplicates are absorbed by the result set
+        elif id(node) not in expanded_dirs:
+            expanded_dirs.add(id(node))
+            stack.extend(node.children)
     return paths
 
 
 @app.command()
 def build(
-    repo: Path = typer.Option(..., "--repo", "-r", help="Path to the repository root.", exists=True, file_okay=False, dir_okay=True, readable=True, resolve_path=True),
+    ctx: typer.Context,
+    repo: Path = typer.Option(..., "--repo", "-r", help="Path to the repository root.", resolve_path=True),
     include: Optional[List[str]] = typer.Option(None, "--include", "-i", help="Glob patterns for files/folders to include (relative to repo root, e.g., 'src/**/*.py', '*.md')."),
     exclude: Optional[List[str]] = typer.Option(None, "--exclude", "-e", help="Glob patterns for files/folders to exclude (applied after includes, e.g., '**/test_*', 'docs/')."),
-    output: Path = typer.Option("prompt.xml", "--output", "-o", help="Output file path for the generated prompt.", writable=True, resolve_path=True),
+    output: Path = typer.Option("prompt.xml", "--output", "-o", help="Output file path for the generated prompt.", resolve_path=True),
     # Snippet selection (same as before)
     objective: Optional[List[str]] = typer.Option(None, "--objective", help="Objective snippet name(s) (e.g., 'Review', 'Develop'). Use 'Custom' for custom text."),
     objective_custom: Optional[str] = typer.Option(None, "--objective-custom", help="Custom text if '--objective Custom' is used."),
@@ -250,112 +205,133 @@ def build(
     """
     Builds a prompt by scanning a repository and selecting snippets via CLI flags.
     """
-    logger.info(f"Building prompt for repository: {repo}")
-    logger.info(f"Output will be saved to: {output}")
-
-    config = get_config() # Load config to get ignore patterns, snippet defs
-    engine = PromptEngine() # Uses loaded config
+    # One stat instead of Click's exists/dir/readable checks; unwritable output surfaces when writing
+    try:
+        repo_stat = os.stat(repo)
+    except FileNotFoundError:
+        raise typer.BadParameter(f"{repo} does not exist", param_hint="'--repo'")
+    if not stat.S_ISDIR(repo_stat.st_mode):
+        raise typer.BadParameter(f"{repo} is not a directory", param_hint="'--repo'")
 
-    # --- Scan Repository (using sync core scanner) ---
-    logger.info("Scanning repository...")
-    # Pass repo path to the scanner core instance
-    scanner = _FileScannerCore(root_path=repo, ignore_patterns=config.ignore_patterns)
+    _init_logging(ctx)
     try:
-        # Run the synchronous scan
-        root_nodes = scanner.scan_directory_sync()
-        if not root_nodes:
-             logger.error("Scan returned no files or directories. Check path and permissions.")
+        logger.info(f"Building prompt for repository: {repo}")
+        logger.info(f"Output will be saved to: {output}")
+
+        config = get_config() # Load config to get ignore patterns, snippet defs
+        engine = PromptEngine() # Uses loaded config
+
+        # --- Scan Repository (using sync core scanner) ---
+        logger.info("Scanning repository...")
+        # Pass repo path to the scanner core instance
+        # Include/exclude globs are also handed to the scanner so it prunes while walking;
+        # _filter_nodes below still resolves which directories are kept
+        scanner = _FileScannerCore(root_path=repo, ignore_patterns=config.ignore_patterns,
+                                   include_patterns=include, exclude_patterns=exclude)
+        try:
+            # Run the synchronous scan
+            root_nodes = scanner.scan_directory_sync()
+            if not root_nodes:
+                 logger.error("Scan returned no files or directories. Check path and permissions.")
+                 raise typer.Exit(code=1)
+            # We expect only one root node from the scan
+            scanned_nodes = root_nodes[0].children # Get children of the root repo node
+        except ValueError as e:
+             logger.error(f"Scan Error: {e}")
              raise typer.Exit(code=1)
-        # We expect only one root node from the scan
-        scanned_nodes = root_nodes[0].children # Get children of the root repo node
-    except ValueError as e:
-         logger.error(f"Scan Error: {e}")
-         raise typer.Exit(code=1)
-    except Exception as e:
-        logger.exception(f"Unexpected error during repository scan: {e}")
-        raise typer.Exit(code=1)
-
-    logger.info(f"Scan complete. Found {len(scanned_nodes)} top-level items initially.")
-
-    # --- Filter scanned nodes based on include/exclude patterns ---
-    selected_nodes_flat = _filter_nodes(scanned_nodes, repo, include, exclude)
-
-    # --- Extract file paths from selected nodes ---
-    # Pass the flat list of kept nodes (including directories) to collect leaf files
-    selected_paths = _collect_paths_from_nodes(selected_nodes_flat)
-
-    if not selected_paths:
-         logger.error("No files selected after applying include/exclude patterns. Aborting.")
-         raise typer.Exit(code=1)
-    logger.info(f"Selected {len(selected_paths)} files for context.")
-
-
-    # --- Determine selected snippets (logic remains the same) ---
-    selected_snippets_cli: Dict[str, Dict[str, Optional[str]]] = {}
-    snippet_map = { # Map CLI flags to config keys and custom text args
-        "objective": ("Objective", objective_custom),
-        "scope": ("Scope", scope_custom),
-        "requirements": ("Requirements", requirements_custom),
-        "constraints": ("Constraints", constraints_custom),
-        "process": ("Process", process_custom),
-        "output_format": ("Output", output_format_custom), # Map CLI flag to config key
-    }
-    cli_args = locals() # Get local variables dict
-
-    for flag_name, (config_key, custom_text_arg) in snippet_map.items():
-        selected_names = cli_args.get(flag_name)
-        if selected_names:
-            category_data = config.prompt_snippets.get(config_key)
-            if category_data is None:
-                 logger.warning(f"Snippet category '{config_key}' not found in configuration. Skipping flag '--{flag_name}'.")
-                 continue
-            category_items = category_data.items
-
-            valid_selections: Dict[str, Optional[str]] = {}
-            for name in selected_names:
-                if name == "Custom":
-                    custom_text = cli_args.get(custom_text_arg)
-                    if custom_text: valid_selections["Custom"] = custom_text
-                    else: logger.warning(f"'--{flag_name} Custom' used but '--{flag_name}-custom' not provided. Ignoring Custom.")
-                elif name in category_items: valid_selections[name] = None
-                else: logger.warning(f"Invalid snippet name '{name}' for category '{config_key}'. Ignoring.")
-            if valid_selections: selected_snippets_cli[config_key] = valid_selections
-
-    selected_questions_cli: Set[str] = set()
-    if question:
-        valid_questions = {q for q in question if q in config.common_questions}
-        invalid_questions = set(question) - valid_questions
-        if invalid_questions: logger.warning(f"Ignoring invalid questions: {invalid_questions}")
-        selected_questions_cli.update(valid_questions)
-
-    # --- Build Instructions ---
-    logger.debug(f"Selected Snippets: {selected_snippets_cli}")
-    logger.debug(f"Selected Questions: {selected_questions_cli}")
-    instructions_xml = engine.build_instructions_xml(selected_snippets_cli, selected_questions_cli)
-
-    # --- Assemble Context (using sync core assembler) ---
-    logger.info("Assembling context...")
-    context_max_tokens = max_tokens if max_tokens is not None else config.max_context_tokens
-    assembler = _ContextAssemblerCore(secret_patterns=config.secret_patterns)
-    try:
-        context_result = assembler.assemble_context_sync(selected_paths, context_max_tokens)
-    except Exception as e:
-        logger.exception(f"Error assembling context: {e}")
-        raise typer.Exit(code=1)
+        except Exception as e:
+            logger.exception(f"Unexpected error during repository scan: {e}")
+            raise typer.Exit(code=1)
 
-    # --- Combine and Save ---
-    final_prompt = instructions_xml + "\n\n" + context_result.context_xml
-    try:
-        output.parent.mkdir(parents=True, exist_ok=True)
-        output.write_text(final_prompt, encoding='utf-8')
-        logger.success(f"Prompt successfully written to: {output}")
-        logger.info(f"Final Token Count: {context_result.total_tokens}/{context_max_tokens}")
-        if context_result.budget_details: logger.info(f"Context Budget Note: {context_result.budget_details}")
-        if context_result.skipped_files: logger.warning(f"Skipped {len(context_result.skipped_files)} files due to budget or errors.")
-
-    except Exception as e:
-        logger.exception(f"Error writing output file: {e}")
-        raise typer.Exit(code=1)
+        logger.info("Scan complete. Found {} top-level items initially.", len(scanned_nodes))
+
+        # --- Filter scanned nodes based on include/exclude patterns ---
+        selected_nodes_flat = _filter_nodes(scanned_nodes, repo, include, exclude)
+
+        # --- Extract file paths from selected nodes ---
+        # Pass the flat list of kept nodes (including directories) to collect leaf files
+        selected_paths = _collect_paths_from_nodes(selected_nodes_flat)
+
+        if not selected_paths:
+             logger.error("No files selected after applying include/exclude patterns. Aborting.")
+             raise typer.Exit(code=1)
+        logger.info("Selected {} files for context.", len(selected_paths))
+
+
+        # --- Determine selected snippets (logic remains the same) ---
+        selected_snippets_cli: Dict[str, Dict[str, Optional[str]]] = {}
+        # Map CLI flags to (config key, selected names, custom text) explicitly rather than via locals()
+        snippet_flags: Dict[str, Tuple[str, Optional[List[str]], Optional[str]]] = {
+            "objective": ("Objective", objective, objective_custom),
+            "scope": ("Scope", scope, scope_custom),
+            "requirements": ("Requirements", requirements, requirements_custom),
+            "constraints": ("Constraints", constraints, constraints_custom),
+            "process": ("Process", process, process_custom),
+            "output-format": ("Output", output_format, output_format_custom), # Map CLI flag to config key
+        }
+
+        for flag_name, (config_key, selected_names, custom_text) in snippet_flags.items():
+            if selected_names:
+                category_data = config.prompt_snippets.get(config_key)
+                if category_data is None:
+                     logger.warning(f"Snippet category '{config_key}' not found in configuration. Skipping flag '--{flag_name}'.")
+                     continue
+                category_items = category_data.items
+
+                valid_selections: Dict[str, Optional[str]] = {}
+                for name in selected_names:
+                    if name == "Custom":
+                        if custom_text: valid_selections["Custom"] = custom_text
+                        else: logger.warning(f"'--{flag_name} Custom' used but '--{flag_name}-custom' not provided. Ignoring Custom.")
+                    elif name in category_items: valid_selections[name] = None
+                    else: logger.warning(f"Invalid snippet name '{name}' for category '{config_key}'. Ignoring.")
+                if valid_selections: selected_snippets_cli[config_key] = valid_selections
+
+        selected_questions_cli: Set[str] = set()
+        if question:
+            # Single partitioning pass; common_questions is a list, so probe a set instead
+            common_questions = set(config.common_questions)
+            invalid_questions: Set[str] = set()
+            for q in question:
+                (selected_questions_cli if q in common_questions else invalid_questions).add(q)
+            if invalid_questions: logger.warning(f"Ignoring invalid questions: {invalid_questions}")
+
+        # --- Build Instructions ---
+        ensure_plugins_loaded() # First point where plugin-provided features could be needed
+        # Lazy: the nested dict/set are only stringified if DEBUG records are actually emitted
+        logger.opt(lazy=True).debug("Selected Snippets: {}", lambda: selected_snippets_cli)
+        logger.opt(lazy=True).debug("Selected Questions: {}", lambda: selected_questions_cli)
+        instructions_xml = engine.build_instructions_xml(selected_snippets_cli, selected_questions_cli)
+
+        # --- Assemble Context (using sync core assembler) ---
+        logger.info("Assembling context...")
+        context_max_tokens = max_tokens if max_tokens is not None else config.max_context_tokens
+        assembler = _ContextAssemblerCore(secret_patterns=config.secret_patterns)
+        try:
+            context_result = assembler.assemble_context_sync(selected_paths, context_max_tokens)
+        except Exception as e:
+            logger.exception(f"Error assembling context: {e}")
+            raise typer.Exit(code=1)
+
+        # --- Combine and Save ---
+        try:
+            output.parent.mkdir(parents=True, exist_ok=True)
+            # Write the parts in sequence rather than concatenating a second full copy of the prompt
+            with output.open('w', encoding='utf-8') as f:
+                f.write(instructions_xml)
+                f.write("\n\n")
+                f.write(context_result.context_xml)
+            logger.success(f"Prompt successfully written to: {output}")
+            logger.info(f"Final Token Count: {context_result.total_tokens}/{context_max_tokens}")
+            if context_result.budget_details: logger.info(f"Context Budget Note: {context_result.budget_details}")
+            if context_result.skipped_files: logger.warning(f"Skipped {len(context_result.skipped_files)} files due to budget or errors.")
+
+        except Exception as e:
+            logger.exception(f"Error writing output file: {e}")
+            raise typer.Exit(code=1)
+    finally:
+        # Console/file sinks are enqueued; drain them on every exit path, typer.Exit included
+        logger.complete()
 
 
 if __name__ == "__main__":
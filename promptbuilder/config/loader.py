@@ -1,18 +1,98 @@
 # promptbuilder/config/loader.py
 import json
 import os
+import pickle
 import tempfile
+import zlib
 from pathlib import Path
-from typing import Optional
+from typing import Any, Optional, Tuple
 
 from pydantic import ValidationError
 from loguru import logger
 
-from .schema import AppConfig
-from .paths import get_user_config_file, get_bundled_config_path
+# orjson parses straight from bytes in C (config.json is still written by pydantic); fall back to the stdlib if it isn't installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None # type: ignore
+    ORJSON_AVAILABLE = False
+
+from .schema import AppConfig, TabConfig, SnippetCategory
+from .paths import get_user_config_file, get_user_config_cache_file, get_bundled_config_path
+from .. import __version__
 
 _cached_config: Optional[AppConfig] = None
 
+def _parse_json(raw: bytes) -> Any:
+    """Parses JSON bytes. orjson.JSONDecodeError subclasses json.JSONDecodeError."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def _dump_config_json(config: AppConfig) -> bytes:
+    """
+    Serializes the config to JSON bytes with 4-space indentation, the format config.json has always had.
+    orjson only indents by 2, so it isn't used here: a rewritten format would defeat save_config's
+    unchanged-file check on every existing config. pydantic serializes in Rust anyway.
+    """
+    return config.model_dump_json(indent=4).encode("utf-8")
+
+# (config.json mtime_ns, config.json size, app version, schema fingerprint)
+_CacheKey = Tuple[int, int, str, int]
+
+def _schema_fingerprint() -> int:
+    """Cheap fingerprint of the config models' fields, so schema edits invalidate the pickle cache."""
+    fields = [(name, repr(info.annotation))
+              for model in (AppConfig, TabConfig, SnippetCategory)
+              for name, info in model.model_fields.items()]
+    return zlib.crc32(repr(fields).encode("utf-8"))
+
+def _config_cache_key(config_path: Path) -> Optional[_CacheKey]:
+    try:
+        st = config_path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, __version__, _schema_fingerprint())
+
+def _load_cached_config(key: _CacheKey) -> Optional[AppConfig]:
+    """Returns the pickled AppConfig if it was built from the config file identified by key."""
+    cache_path = get_user_config_cache_file()
+    try:
+        with open(cache_path, 'rb') as f:
+            cached_key, config = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e: # Corrupt or incompatible pickle: just rebuild it
+        logger.debug(f"Ignoring unreadable config cache {cache_path}: {e}")
+        return None
+    if cached_key != key or not isinstance(config, AppConfig):
+        return None
+    logger.debug(f"Loaded configuration from cache: {cache_path}")
+    return config
+
+def _write_config_cache(key: _CacheKey, config: AppConfig) -> None:
+    """Atomically pickles (key, config) next to the user config. Failures are non-fatal."""
+    cache_path = get_user_config_cache_file()
+    temp_file_path: Optional[Path] = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            mode='wb',
+            dir=cache_path.parent,
+            prefix=f".{cache_path.name}_tmp",
+            delete=False
+        ) as temp_f:
+            temp_file_path = Path(temp_f.name)
+            pickle.dump((key, config), temp_f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file_path, cache_path)
+        temp_file_path = None
+    except Exception as e:
+        logger.debug(f"Could not write config cache {cache_path}: {e}")
+    finally:
+        if temp_file_path and temp_file_path.exists():
+            try: temp_file_path.unlink()
+            except OSError: pass
+
 def load_config() -> AppConfig:
     """Loads the application configuration."""
     global _cached_config
@@ -21,31 +101,43 @@ def load_config() -> AppConfig:
 
     config_path = get_user_config_file()
     loaded_data = {}
+    # A single stat serves as both the existence check and the cache key
+    cache_key: Optional[_CacheKey] = _config_cache_key(config_path)
+    user_config_found = cache_key is not None
+
+    if cache_key is not None:
+        # Fast path: reuse the validated config pickled on a previous run if the file is unchanged
+        cached = _load_cached_config(cache_key)
+        if cached is not None:
+            _cached_config = cached
+            return cached
 
-    if config_path.exists():
         logger.info(f"Loading user configuration from: {config_path}")
         try:
-            with open(config_path, 'r', encoding='utf-8') as f:
-                loaded_data = json.load(f)
+            loaded_data = _parse_json(config_path.read_bytes())
+        except FileNotFoundError:
+            user_config_found = False # Removed since the stat; treat as missing
+            cache_key = None
         except (json.JSONDecodeError, OSError) as e:
             logger.error(f"Failed to load user config file {config_path}: {e}")
+            cache_key = None # Don't cache defaults against a file we're about to move away
             # Consider backing up the corrupted file here
             try:
                  backup_path = config_path.with_suffix(".json.corrupted")
-                 if backup_path.exists(): backup_path.unlink(missing_ok=True) # Remove old backup
+                 backup_path.unlink(missing_ok=True) # Remove old backup
                  config_path.rename(backup_path)
                  logger.info(f"Backed up corrupted config to: {backup_path}")
             except OSError as backup_err:
                  logger.error(f"Failed to backup corrupted config: {backup_err}")
             loaded_data = {} # Fallback to defaults
-    else:
+
+    if not user_config_found:
         logger.info("User config file not found, trying bundled config.")
-        bundled_path = get_bundled_config_path()
-        if bundled_path and bundled_path.exists():
+        bundled_path = get_bundled_config_path() # Only returned if it exists (cached lookup)
+        if bundled_path:
              logger.info(f"Loading bundled configuration from: {bundled_path}")
              try:
-                 with open(bundled_path, 'r', encoding='utf-8') as f:
-                     loaded_data = json.load(f)
+                 loaded_data = _parse_json(bundled_path.read_bytes())
              except (json.JSONDecodeError, OSError) as e:
                  logger.error(f"Failed to load bundled config file {bundled_path}: {e}")
                  loaded_data = {}
@@ -53,9 +145,14 @@ def load_config() -> AppConfig:
             logger.info("No user or bundled config found. Using default settings.")
 
     try:
-        config = AppConfig(**loaded_data)
+        # Validated, not model_construct()ed: pydantic-core's validation is as fast as constructing
+        # the nested models in Python, and warm loads skip it via the pickle cache anyway.
+        # model_validate also turns a non-object JSON document into a ValidationError (handled below).
+        config = AppConfig.model_validate(loaded_data)
         _cached_config = config
         logger.info("Configuration loaded successfully.")
+        if cache_key is not None:
+            _write_config_cache(cache_key, config)
         # Optionally save the config back immediately if it was created/migrated
         # save_config(config) # Avoid saving on load unless needed
         return config
@@ -68,16 +165,25 @@ def load_config() -> AppConfig:
     # TODO: Implement environment variable overrides (PROMPTBUILDER_*)
 
 def save_config(config: AppConfig) -> None:
-    """Saves the application configuration using atomic write via NamedTemporaryFile."""
+    """Saves the application configuration using atomic write via NamedTemporaryFile. Skipped if unchanged."""
     config_path = get_user_config_file()
-    logger.info(f"Saving configuration to: {config_path}")
     temp_file_path: Optional[Path] = None
     try:
+        # Serialize straight to UTF-8 bytes
+        data = _dump_config_json(config)
+        # Most exits change nothing: skip the temp file + fsync, and keep config.json's mtime so the
+        # pickle cache stays valid for the next start. Comparing bytes is cheaper than the write.
+        try:
+            if config_path.read_bytes() == data:
+                logger.debug(f"Configuration unchanged, not rewriting: {config_path}")
+                return
+        except OSError:
+            pass # Missing or unreadable: write it
+        logger.info(f"Saving configuration to: {config_path}")
         # Fixes Polish P-3: Use NamedTemporaryFile for atomic save and cleanup
         # Create temp file in the *same directory* as the target for atomic os.replace
         with tempfile.NamedTemporaryFile(
-            mode='w',
-            encoding='utf-8',
+            mode='wb',
             dir=config_path.parent,
             prefix=f".{config_path.name}_tmp", # Use a prefix related to the target file
             suffix=".json",
@@ -85,8 +191,7 @@ def save_config(config: AppConfig) -> None:
         ) as temp_f:
             temp_file_path = Path(temp_f.name)
             logger.debug(f"Writing config to temporary file: {temp_file_path}")
-            # Use Pydantic's json export for proper serialization
-            temp_f.write(config.model_dump_json(indent=4))
+            temp_f.write(data)
             # Ensure data is flushed to disk before replacing
             temp_f.flush()
             os.fsync(temp_f.fileno())
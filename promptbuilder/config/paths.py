@@ -1,17 +1,22 @@
 # promptbuilder/config/paths.py
 import sys
 import os
+from functools import cache
 from pathlib import Path
-# import platform # No longer needed for Windows-only
+
+# Results are cached per process: the environment, bundle location and directories
+# don't change at runtime, and the mkdir calls then only hit the filesystem once.
 
 def _get_app_name() -> str:
     # Centralize the app name
     return "PromptBuilder"
 
+@cache
 def is_frozen() -> bool:
     """Check if running in a PyInstaller bundle."""
     return getattr(sys, 'frozen', False) and hasattr(sys, '_MEIPASS')
 
+@cache
 def get_bundle_dir() -> Path:
     """Get the base directory of the PyInstaller bundle or script dir."""
     if is_frozen():
@@ -20,6 +25,7 @@ def get_bundle_dir() -> Path:
     # Running from source: return project root (assuming standard structure)
     return Path(__file__).parent.parent.parent
 
+@cache
 def get_user_data_dir() -> Path:
     """Get the Windows user application data directory."""
     app_name = _get_app_name()
@@ -34,22 +40,36 @@ def get_user_data_dir() -> Path:
     path.mkdir(parents=True, exist_ok=True)
     return path
 
+@cache
 def get_user_config_file() -> Path:
     """Get the path to the user's config.json file."""
     return get_user_data_dir() / "config.json"
 
+@cache
+def get_user_config_cache_file() -> Path:
+    """Get the path to the pickled cache of the validated user config."""
+    return get_user_data_dir() / "config.cache.pkl"
+
+@cache
+def get_user_token_cache_file() -> Path:
+    """Get the path to the SQLite cache of token counts by content hash."""
+    return get_user_data_dir() / "tokens.db"
+
+@cache
 def get_user_log_dir() -> Path:
     """Get the path to the user's log directory."""
     path = get_user_data_dir() / "logs"
     path.mkdir(parents=True, exist_ok=True)
     return path
 
+@cache
 def get_user_plugins_dir() -> Path:
     """Get the path to the user's plugins directory."""
     path = get_user_data_dir() / "plugins"
     path.mkdir(parents=True, exist_ok=True)
     return path
 
+@cache
 def get_bundled_config_path() -> Path | None:
     """Get the path to a config file potentially bundled with the app."""
     if is_frozen():
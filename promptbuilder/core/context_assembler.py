@@ -1,29 +1,95 @@
 # promptbuilder/core/context_assembler.py
+import os
 import re
 import html # For escaping
+import io
+import codecs
+import functools
+import stat
 from pathlib import Path
-from typing import List, Set, Tuple, Callable, Optional
-import mmap
+from typing import List, Set, Tuple, Callable, Optional, Pattern
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from loguru import logger
 
 from .models import ContextResult, ContextFile
 from .token_counter import count_tokens_sync, _get_cached_encoder, DEFAULT_ENCODING # Use sync counter, import helper
+from .token_cache import count_tokens_batch_cached
+
+TRUNCATION_MARKER = "\n... [truncated]"
+# Statuses whose content is the file's text (error statuses carry a message and count as 0 tokens)
+_TEXT_STATUSES = ("read_ok", "read_scrubbed", "read_decode_error")
+
+def _line_numbers(text: str, offsets: List[int]) -> List[int]:
+    """1-based line numbers for ascending character offsets, counting newlines incrementally."""
+    line = 1; prev = 0; result = []
+    for offset in offsets:
+        line += text.count("\n", prev, offset); prev = offset; result.append(line)
+    return result
+
+_LINE_SPACE = r" \t\r\f\v" # ASCII \s without the newline
+
+def _stop_at_line_ends(pattern: str) -> str:
+    r"""
+    Rewrites \s so it can't match a newline: the fused pattern runs over the whole file, and a
+    secret pattern must not join two lines (e.g. "# Secret" followed by an identifier on the next one).
+    \s in a negated class already excludes newlines and is left alone.
+    """
+    out: List[str] = []; i = 0; n = len(pattern); class_start = -1; negated = False
+    while i < n:
+        c = pattern[i]
+        if c == "\\" and i + 1 < n:
+            escape = pattern[i:i + 2]; i += 2
+            if escape == r"\s" and not (class_start >= 0 and negated): out.append(_LINE_SPACE if class_start >= 0 else f"[{_LINE_SPACE}]")
+            else: out.append(escape)
+            continue
+        if class_start < 0:
+            if c == "[":
+                negated = pattern.startswith("^", i + 1); class_start = i + 1 + negated
+        elif c == "]" and i > class_start: class_start = -1 # A "]" first in the class is a literal
+        out.append(c); i += 1
+    return "".join(out)
+
+@functools.lru_cache(maxsize=8)
+def _compile_secret_patterns(patterns: Tuple[str, ...]) -> Tuple[Optional[Pattern[str]], Optional[Pattern[bytes]]]:
+    r"""
+    Fuses the secret patterns into one alternation so the scrub is a single pass over the file,
+    with \s restricted to a single line (see _stop_at_line_ends).
+    Patterns are compiled with re.ASCII: \s, \w, \b and IGNORECASE only consider ASCII characters.
+    That keeps the str and bytes forms equivalent on ASCII text, so there a bytes miss rules out a str match;
+    multi-byte characters break it (".{4}" counts bytes, not characters).
+    The bytes form (searched directly on the raw buffer) is None if a pattern isn't ASCII.
+    """
+    if not patterns:
+        return None, None
+    source = "|".join(f"(?:{_stop_at_line_ends(p)})" for p in patterns); flags = re.IGNORECASE | re.ASCII
+    return re.compile(source, flags), (re.compile(source.encode("ascii"), flags) if source.isascii() else None)
+
+def _cdata_escape(text: str) -> str:
+    """Makes text safe inside a CDATA section: only a literal ']]>' needs splitting (rare in source)."""
+    return text.replace("]]>", "]]]]><![CDATA[>")
 
 # --- Core Logic (Pure Python) ---
 
 class _ContextAssemblerCore:
     """Pure Python implementation of context assembly."""
-    MAX_FILE_SIZE_MMAP = 10 * 1024 * 1024; MAX_FILE_SIZE_WARN = 50 * 1024 * 1024
+    MAX_FILE_SIZE_READ_BYTES = 10 * 1024 * 1024; MAX_FILE_SIZE_WARN = 50 * 1024 * 1024
+    MAX_READ_WORKERS = min(32, (os.cpu_count() or 1) * 4) # File reads overlap I/O waits; tiktoken releases the GIL
+    PROGRESS_INTERVAL = 0.05 # Seconds between per-file progress messages (~20 Hz); stage changes always go out
 
     def __init__(self, secret_patterns: List[str],
                  progress_callback: Optional[Callable[[str], None]] = None, error_callback: Optional[Callable[[str], None]] = None):
-        self.secret_patterns_compiled = [re.compile(pattern, re.IGNORECASE) for pattern in secret_patterns]
+        # Compiled once per distinct pattern list and shared by every assembler (one per UI run)
+        self._secret_re, self._secret_re_bytes = _compile_secret_patterns(tuple(secret_patterns))
         self.progress_callback = progress_callback; self.error_callback = error_callback
-        self._is_cancelled = threading.Event(); logger.debug("Context assembler core initialized.")
+        self._is_cancelled = threading.Event(); self._last_progress_ts = 0.0; logger.debug("Context assembler core initialized.")
 
-    def _emit_progress(self, message: str):
+    def _emit_progress(self, message: str, force: bool = False):
         if self.progress_callback:
+            now = time.monotonic()
+            if not force and now - self._last_progress_ts < self.PROGRESS_INTERVAL: return
+            self._last_progress_ts = now
             try:
                 self.progress_callback(message)
             except Exception as e:
@@ -35,50 +101,53 @@ class _ContextAssemblerCore:
             except Exception as e:
                 logger.error(f"Error in error callback: {e}")
 
-    def _read_file_content(self, file_path: Path) -> Tuple[str, str, int]:
-        """Reads file content, handles encoding, size, secrets. Returns (content, status, initial_token_count)."""
-        status = "read_ok"; content = ""; initial_tokens = 0
+    def _read_file_content(self, file_path: Path, with_tokens: bool = True, size_hint: Optional[int] = None) -> Tuple[str, str, int]:
+        """
+        Reads file content, handles encoding, size, secrets. Returns (content, status, initial_token_count).
+        With with_tokens=False the count is left at 0 for the caller to batch. A caller that has
+        already stat'ed the file can pass its size as size_hint to skip another stat.
+        """
+        status = "read_ok"; content = ""; initial_tokens = 0; needs_scrub = True
         try:
-            fsize = file_path.stat().st_size
-            if fsize > self.MAX_FILE_SIZE_WARN: logger.warning(f"Reading large file ({fsize / 1024**2:.1f} MB): {file_path.name}"); self._emit_progress(f"Reading large file: {file_path.name}...")
-            use_mmap = fsize > self.MAX_FILE_SIZE_MMAP and fsize > 0; encodings_to_try = ['utf-8', 'latin-1', 'cp1252']
-            if use_mmap:
-                with open(file_path, "rb") as f:
-                    if fsize == 0: content = ""
-                    else:
-                        try:
-                            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
-                                decoded = False
-                                for enc in encodings_to_try:
-                                    if self._is_cancelled.is_set(): return "<cancelled>", "read_cancelled", 0
-                                    try: content = mm[:].decode(enc); decoded = True; break
-                                    except UnicodeDecodeError: continue
-                                if not decoded: content = mm[:].decode('utf-8', errors='replace'); status = "read_decode_error"
-                        except ValueError as mmap_err:
-                             if "mmap length is greater than file size" in str(mmap_err): content = ""
-                             else: raise
+            fsize = file_path.stat().st_size if size_hint is None else size_hint
+            if fsize > self.MAX_FILE_SIZE_WARN: logger.warning(f"Reading large file ({fsize / 1024**2:.1f} MB): {file_path.name}"); self._emit_progress(f"Reading large file: {file_path.name}...", force=True)
+            # Read the bytes once and try each encoding on them in memory (read_text re-read the file per attempt);
+            # files up to MAX_FILE_SIZE_READ_BYTES just use read_bytes()
+            if fsize > self.MAX_FILE_SIZE_READ_BYTES:
+                # One sequential read into a pre-sized buffer (lets OS readahead work, no per-page faults
+                # as with mmap); every decode attempt and the secret pre-scan then run on that buffer
+                buf = bytearray(fsize)
+                with open(file_path, "rb") as f: n_read = f.readinto(buf) # BufferedReader loops to EOF, bypassing its own buffer
+                if n_read < fsize: del buf[n_read:] # File shrank since the stat
+                data = buf
             else:
-                 decoded = False
-                 for enc in encodings_to_try:
-                     if self._is_cancelled.is_set(): return "<cancelled>", "read_cancelled", 0
-                     try: content = file_path.read_text(encoding=enc); decoded = True; break
-                     except UnicodeDecodeError: continue
-                     except OSError as read_err: logger.error(f"Error reading file {file_path}: {read_err}"); return f"<Error reading file: {read_err}>", "read_error", 0
-                 if not decoded:
-                     try: binary_content = file_path.read_bytes(); content = binary_content.decode('utf-8', errors='replace'); status = "read_decode_error"
-                     except OSError as read_err: logger.error(f"Error reading file as binary {file_path}: {read_err}"); return f"<Error reading file: {read_err}>", "read_error", 0
-            # Secrets Scrubbing
-            lines = content.splitlines(); scrubbed_lines = []; was_scrubbed = False
-            for line_num, line in enumerate(lines):
+                data = file_path.read_bytes()
+            # The encodings tried are all ASCII-compatible, so on ASCII data a bytes miss holds for the decoded
+            # text (only without CRs: newline translation below could otherwise create a str-only match)
+            if (self._secret_re_bytes is not None and data.isascii() and b"\r" not in data
+                    and self._secret_re_bytes.search(data) is None): needs_scrub = False
+            decoded = False
+            for enc in ('utf-8', 'latin-1', 'cp1252'):
                 if self._is_cancelled.is_set(): return "<cancelled>", "read_cancelled", 0
-                scrubbed_line = line
-                for pattern in self.secret_patterns_compiled:
-                    def repl(match): nonlocal was_scrubbed; was_scrubbed = True; return '<redacted reason="secret">'
-                    scrubbed_line = pattern.sub(repl, scrubbed_line)
-                scrubbed_lines.append(scrubbed_line)
-            if was_scrubbed: content = "\n".join(scrubbed_lines); logger.info(f"Scrubbed potential secrets in: {file_path.name}");
-            if status == "read_ok": status = "read_scrubbed"
+                try: content, _ = codecs.lookup(enc).decode(data); decoded = True; break
+                except UnicodeDecodeError: continue
+            if not decoded: content, _ = codecs.lookup('utf-8').decode(data, 'replace'); status = "read_decode_error"
+            del data
+            # Universal newlines, as read_text applied them
+            if "\r" in content: content = content.replace("\r\n", "\n").replace("\r", "\n")
+            # Secrets Scrubbing
+            if self._is_cancelled.is_set(): return "<cancelled>", "read_cancelled", 0
+            if self._secret_re is not None and needs_scrub:
+                match_offsets: List[int] = []
+                def _redact(match): match_offsets.append(match.start()); return '<redacted reason="secret">'
+                original = content; content, n_scrubbed = self._secret_re.subn(_redact, content)
+                if n_scrubbed:
+                    logger.info(f"Scrubbed potential secrets in: {file_path.name}")
+                    # Line numbers are only worked out (from the match offsets) if debug logging wants them
+                    logger.opt(lazy=True).debug("Redacted lines in {}: {}", lambda: file_path.name, lambda: _line_numbers(original, match_offsets))
+                    if status == "read_ok": status = "read_scrubbed"
             # Token Counting & Progress
+            if not with_tokens: self._emit_progress(f"Read: {file_path.name}"); return content, status, 0
             self._emit_progress(f"Counting tokens for: {file_path.name}...")
             initial_tokens = count_tokens_sync(content)
             self._emit_progress(f"Processed: {file_path.name} ({initial_tokens} tokens)")
@@ -93,11 +162,11 @@ class _ContextAssemblerCore:
         current_tokens = 0; budget_details = ""
         files_data.sort(key=lambda f: f.path); encoder = _get_cached_encoder(DEFAULT_ENCODING)
 
-        for file_info in files_data:
+        for idx, file_info in enumerate(files_data):
             if self._is_cancelled.is_set():
                  # Fixes Polish P-2: Remove "(cancelled)" string as CLI doesn't cancel
                  budget_details += f"Skipped remaining files. "
-                 idx = files_data.index(file_info); skipped_files.extend(files_data[idx:]); break
+                 skipped_files.extend(files_data[idx:]); break
 
             needed_tokens = file_info.tokens
             if current_tokens + needed_tokens <= max_tokens:
@@ -111,13 +180,16 @@ class _ContextAssemblerCore:
                         encoded_tokens = encoder.encode(file_info.content)
                         truncated_tokens_list = encoded_tokens[:remaining_tokens]
                         if self._is_cancelled.is_set(): break
-                        try: truncated_content = encoder.decode(truncated_tokens_list)
+                        try: truncated_content = encoder.decode(truncated_tokens_list); truncated_count = len(truncated_tokens_list)
                         except Exception as decode_err:
                              logger.warning(f"Error decoding truncated tokens for {file_info.path.name}, falling back to char estimate: {decode_err}")
-                             chars_approx = remaining_tokens * 3; truncated_content = file_info.content[:chars_approx]
-                        file_info.content = truncated_content + "\n... [truncated]"
+                             chars_approx = remaining_tokens * 3; truncated_content = file_info.content[:chars_approx]; truncated_count = None
+                        file_info.content = truncated_content + TRUNCATION_MARKER
                         if self._is_cancelled.is_set(): break
-                        file_info.tokens = count_tokens_sync(file_info.content); file_info.status = "truncated"
+                        # The kept token slice is already known; only the char-estimate fallback needs a recount
+                        if truncated_count is None: file_info.tokens = count_tokens_sync(file_info.content)
+                        else: file_info.tokens = truncated_count + count_tokens_sync(TRUNCATION_MARKER)
+                        file_info.status = "truncated"
                         included_files.append(file_info); current_tokens += file_info.tokens
                         budget_details += f"Truncated {file_info.path.name}. "
                     except Exception as trunc_err:
@@ -130,7 +202,7 @@ class _ContextAssemblerCore:
                     file_info.status = f"skipped_{reason.split()[0]}"; skipped_files.append(file_info)
                     budget_details += f"Skipped {file_info.path.name} ({reason}). "
                 # Stop processing once budget is hit
-                idx = files_data.index(file_info); skipped_files.extend(files_data[idx+1:])
+                skipped_files.extend(files_data[idx+1:])
                 budget_details += f"Skipped {len(files_data) - (idx+1)} more files (budget)."
                 break
 
@@ -140,25 +212,59 @@ class _ContextAssemblerCore:
 
         return included_files, skipped_files, current_tokens, budget_details.strip()
 
+    def _load_context_file(self, file_path: Path) -> Optional[ContextFile]:
+        """Reads one selected path into a ContextFile (runs on a pool thread). None for non-files or on cancel."""
+        if self._is_cancelled.is_set(): return None
+        # One stat serves both the regular-file check and the size the reader needs
+        try: file_stat = file_path.stat()
+        except OSError: file_stat = None
+        if file_stat is None or not stat.S_ISREG(file_stat.st_mode): logger.warning(f"Skipping non-file path: {file_path}"); return None
+        content, status, initial_tokens = self._read_file_content(file_path, with_tokens=False, size_hint=file_stat.st_size)
+        if status == "read_cancelled": return None
+        return ContextFile(path=file_path, content=content, tokens=initial_tokens, status=status)
+
+    def _read_chunk(self, executor: ThreadPoolExecutor, paths: List[Path]) -> List[ContextFile]:
+        """Reads paths on the pool, returns them in path order with batched token counts ([] on cancel)."""
+        chunk_files: List[ContextFile] = []
+        futures = [executor.submit(self._load_context_file, p) for p in paths]
+        for future in as_completed(futures):
+            if self._is_cancelled.is_set():
+                for f in futures: f.cancel()
+                return []
+            file_data = future.result()
+            if file_data is not None: chunk_files.append(file_data)
+        chunk_files.sort(key=lambda f: f.path) # Completion order is arbitrary; restore path order
+        # Token counts in batched encoder calls rather than one call per file; unchanged content comes from the cache
+        text_files = [f for f in chunk_files if f.status in _TEXT_STATUSES]
+        for file_info, tokens in zip(text_files, count_tokens_batch_cached([f.content for f in text_files])):
+            file_info.tokens = tokens
+        return chunk_files
+
     def assemble_context_sync(self, selected_paths: Set[Path], max_tokens: int) -> ContextResult:
         """Synchronously assembles the context block."""
         logger.info(f"[Sync Assemble] Starting for {len(selected_paths)} paths, max_tokens={max_tokens}")
-        self._is_cancelled.clear(); all_files_data: List[ContextFile] = []; processed_count = 0
-        sorted_paths = sorted(list(selected_paths)); total_paths = len(sorted_paths)
-        for file_path in sorted_paths:
-            if self._is_cancelled.is_set(): break
-            if not file_path.is_file(): logger.warning(f"Skipping non-file path: {file_path}"); continue
-            processed_count += 1
-            content, status, initial_tokens = self._read_file_content(file_path)
-            if status == "read_cancelled": break
-            all_files_data.append(ContextFile(path=file_path, content=content, tokens=initial_tokens, status=status))
+        self._is_cancelled.clear(); all_files_data: List[ContextFile] = []
+        sorted_paths = sorted(list(selected_paths)); total_paths = len(sorted_paths); next_idx = 0
+        if sorted_paths:
+            # Read in path-order chunks and stop once the tokens read exceed the budget: _apply_budget
+            # stops at the first file that doesn't fit, so nothing after that point would be used
+            chunk_size = self.MAX_READ_WORKERS * 4; tokens_read = 0
+            with ThreadPoolExecutor(max_workers=min(self.MAX_READ_WORKERS, total_paths)) as executor:
+                while next_idx < total_paths and tokens_read <= max_tokens and not self._is_cancelled.is_set():
+                    chunk = sorted_paths[next_idx:next_idx + chunk_size]; next_idx += len(chunk)
+                    self._emit_progress(f"Reading files ({next_idx}/{total_paths})...", force=True)
+                    chunk_files = self._read_chunk(executor, chunk)
+                    tokens_read += sum(f.tokens for f in chunk_files); all_files_data.extend(chunk_files)
+            if next_idx < total_paths and not self._is_cancelled.is_set():
+                logger.info(f"[Sync Assemble] Budget exhausted; not reading {total_paths - next_idx} remaining paths.")
+                all_files_data.extend(ContextFile(path=p, content="", tokens=0, status="skipped_budget") for p in sorted_paths[next_idx:])
 
         if self._is_cancelled.is_set():
             logger.info("[Sync Assemble] Cancelled during file reading.")
             # Fixes Polish P-2: Remove "(cancelled)" string
             return ContextResult(context_xml="<context><cancelled/></context>", included_files=[], skipped_files=all_files_data, total_tokens=0, budget_details="Assembly cancelled")
 
-        self._emit_progress("Applying token budget...")
+        self._emit_progress("Applying token budget...", force=True)
         included_files, skipped_files, total_tokens, budget_details = self._apply_budget(all_files_data, max_tokens)
 
         if self._is_cancelled.is_set():
@@ -166,14 +272,15 @@ class _ContextAssemblerCore:
              # Fixes Polish P-2: Remove "(cancelled)" string
              return ContextResult(context_xml="<context><cancelled/></context>", included_files=included_files, skipped_files=skipped_files, total_tokens=total_tokens, budget_details="Assembly cancelled during budget")
 
-        self._emit_progress("Building final XML...")
-        context_lines = ["<context>"]
+        self._emit_progress("Building final XML...", force=True)
+        # Stream pieces into one buffer so each escaped file body is transient, not held in a list until a join
+        buf = io.StringIO(); buf.write("<context>")
         for file_info in included_files:
              safe_name = html.escape(file_info.path.name, quote=True); safe_path = html.escape(str(file_info.path), quote=True)
-             safe_status = html.escape(file_info.status, quote=True); escaped_content = html.escape(file_info.content)
-             context_lines.append(f"    <file name='{safe_name}' path='{safe_path}' status='{safe_status}' tokens='{file_info.tokens}'>")
-             context_lines.append(escaped_content); context_lines.append(f"    </file>")
-        context_lines.append("</context>"); context_xml = "\n".join(context_lines)
+             safe_status = html.escape(file_info.status, quote=True)
+             buf.write(f"\n    <file name='{safe_name}' path='{safe_path}' status='{safe_status}' tokens='{file_info.tokens}'>\n")
+             buf.write("<![CDATA["); buf.write(_cdata_escape(file_info.content)); buf.write("]]>\n    </file>")
+        buf.write("\n</context>"); context_xml = buf.getvalue()
         result = ContextResult(context_xml=context_xml, included_files=included_files, skipped_files=skipped_files, total_tokens=total_tokens, budget_details=budget_details)
         logger.info(f"[Sync Assemble] Finished. Tokens: {total_tokens}/{max_tokens}. Included: {len(included_files)}, Skipped: {len(skipped_files)}.")
         return result
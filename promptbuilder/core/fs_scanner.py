@@ -1,33 +1,107 @@
 # promptbuilder/core/fs_scanner.py
 import os
+import re
 import fnmatch
 import threading
+import functools
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Callable, Tuple
+from typing import List, Optional, Callable, Tuple, Pattern
 import time
 from loguru import logger
 
 from .models import FileNode
 
+# --- Glob Helpers ---
+
+# fnmatch.fnmatch normalizes case on case-insensitive platforms (Windows); mirror that
+_GLOB_CASE_INSENSITIVE = os.path.normcase("A") == "a"
+
+def compile_glob_patterns(patterns: Optional[List[str]]) -> Optional[Pattern[str]]:
+    """
+    Fuses glob patterns into a single alternation regex, compiled once up front,
+    so each path costs one regex call instead of one fnmatch call per pattern.
+    Returns None if there are no patterns.
+    """
+    if not patterns:
+        return None
+    flags = re.IGNORECASE if _GLOB_CASE_INSENSITIVE else 0
+    # Each translated piece carries its own end anchor, so a plain join is safe
+    return re.compile("|".join(fnmatch.translate(p) for p in patterns), flags)
+
+class GlobMatcher:
+    """
+    Include/exclude globs split at compile time: patterns without '/' are tested against
+    the basename only, patterns with '/' against the relative path only, so each path
+    costs at most one regex call per kind instead of two.
+    """
+    __slots__ = ("name_re", "path_re")
+
+    def __init__(self, patterns: List[str]):
+        self.name_re = compile_glob_patterns([p for p in patterns if "/" not in p])
+        self.path_re = compile_glob_patterns([p for p in patterns if "/" in p])
+
+    def matches(self, relative_path: str, name: str) -> bool:
+        return ((self.name_re is not None and self.name_re.match(name) is not None)
+                or (self.path_re is not None and self.path_re.match(relative_path) is not None))
+
+def compile_glob_matcher(patterns: Optional[List[str]]) -> Optional[GlobMatcher]:
+    """Returns a GlobMatcher for the patterns, or None if there are none."""
+    return GlobMatcher(patterns) if patterns else None
+
+def _glob_literal_prefixes(patterns: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    Returns the literal leading part (before the first wildcard) of each pattern, or
+    None if any pattern has no '/' and so may match a basename at any depth.
+    """
+    if not patterns or any("/" not in p for p in patterns):
+        return None
+    prefixes = [re.split(r"[*?\[]", p, maxsplit=1)[0] for p in patterns]
+    return [p.lower() for p in prefixes] if _GLOB_CASE_INSENSITIVE else prefixes
+
 # --- Core Logic (Pure Python) ---
 
 class _FileScannerCore:
     """Pure Python implementation of file system scanning."""
+    # Subdirectory scans run on a pool (scandir/stat release the GIL). A scan is only handed to the
+    # pool while a slot is free, else it runs inline; with no more slots than workers, a parent
+    # waiting on its children can never starve them of a thread.
+    MAX_SCAN_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+    PROGRESS_INTERVAL = 0.05 # Seconds between "Scanning: ..." messages (~20 Hz), independent of directory count
 
     def __init__(self,
                  root_path: Path, # Store root path for relative calculations
                  ignore_patterns: List[str],
                  progress_callback: Optional[Callable[[str], None]] = None,
-                 error_callback: Optional[Callable[[str], None]] = None):
+                 error_callback: Optional[Callable[[str], None]] = None,
+                 include_patterns: Optional[List[str]] = None,
+                 exclude_patterns: Optional[List[str]] = None):
         self.root_path = root_path.resolve() # Ensure root is absolute and resolved
         self.ignore_patterns = ignore_patterns
+        # Ignore globs fused once: each entry costs one match against its name and one against its
+        # relative path. Patterns ending in '/' (e.g. "build/") only ever ignore directories.
+        self._ignore_re = compile_glob_patterns([p for p in ignore_patterns if not p.endswith("/")])
+        self._dir_ignore_re = compile_glob_patterns([p.rstrip("/") for p in ignore_patterns if p.endswith("/") and p.rstrip("/")])
+        # Basenames repeat heavily across a tree (__pycache__, node_modules, ...); memoize that half
+        self._name_ignored = functools.lru_cache(maxsize=4096)(self._name_ignored_impl)
+        # Optional selection globs (CLI --include/--exclude) used to prune while walking,
+        # so nodes the caller would filter out are never materialized
+        self.include_matcher = compile_glob_matcher(include_patterns)
+        self.exclude_matcher = compile_glob_matcher(exclude_patterns)
+        self._include_prefixes = _glob_literal_prefixes(include_patterns)
         self.progress_callback = progress_callback
         self.error_callback = error_callback
         self._is_cancelled = threading.Event() # Use threading.Event for cancellation flag
+        self._executor: Optional[ThreadPoolExecutor] = None # Only set while scan_directory_sync runs
+        self._pool_slots = threading.BoundedSemaphore(self.MAX_SCAN_WORKERS)
+        self._last_progress_ts = 0.0
         logger.debug(f"Scanner core initialized for {self.root_path} with ignores: {self.ignore_patterns}")
 
-    def _emit_progress(self, message: str):
+    def _emit_progress(self, message: str, force: bool = False):
         if self.progress_callback:
+            now = time.monotonic()
+            if not force and now - self._last_progress_ts < self.PROGRESS_INTERVAL: return
+            self._last_progress_ts = now
             try: self.progress_callback(message)
             except Exception as e: logger.error(f"Error in progress callback: {e}")
 
@@ -36,10 +110,11 @@ class _FileScannerCore:
             try: self.error_callback(message)
             except Exception as e: logger.error(f"Error in error callback: {e}")
 
-    def is_ignored(self, entry_path: Path, is_dir: bool) -> bool:
+    def is_ignored(self, entry_path: Path, is_dir: bool, relative_path_str: Optional[str] = None) -> bool:
         """
         Check if a path should be ignored based on symlinks or ignore patterns.
         Patterns are matched against the name and the path relative to the root.
+        Callers that already know the POSIX relative path can pass it to skip recomputing it.
         NOTE: Symlink check happens *before* pattern matching.
         """
         # Check symlink first (important for security) - This check was already here and correct
@@ -53,66 +128,101 @@ class _FileScannerCore:
              return True
 
         # Calculate relative path for pattern matching
-        try:
-            relative_path = entry_path.relative_to(self.root_path)
-            relative_path_str = relative_path.as_posix() # Use POSIX slashes for consistency
-        except ValueError:
-            logger.warning(f"Could not get relative path for {entry_path} against root {self.root_path}. Checking name only.")
-            relative_path_str = None
-
-        name = entry_path.name
-
-        # Check against ignore patterns
-        for pattern in self.ignore_patterns:
-            if fnmatch.fnmatch(name, pattern):
-                logger.trace(f"Ignoring '{name}' due to basename pattern '{pattern}'")
-                return True
-            if relative_path_str and fnmatch.fnmatch(relative_path_str, pattern):
-                 logger.trace(f"Ignoring '{relative_path_str}' due to relative path pattern '{pattern}'")
-                 return True
-            # TODO: Add support for directory-specific patterns (e.g., "build/")
+        if relative_path_str is None:
+            try:
+                relative_path = entry_path.relative_to(self.root_path)
+                relative_path_str = relative_path.as_posix() # Use POSIX slashes for consistency
+            except ValueError:
+                logger.warning(f"Could not get relative path for {entry_path} against root {self.root_path}. Checking name only.")
+
+        return self._matches_ignore_patterns(entry_path.name, relative_path_str, is_dir)
 
+    def _matches_ignore_patterns(self, name: str, relative_path_str: Optional[str], is_dir: bool) -> bool:
+        """Pattern half of is_ignored, for callers that have already ruled out symlinks."""
+        if self._name_ignored(name, is_dir) or (relative_path_str and self._glob_ignored(relative_path_str, is_dir)):
+            logger.trace(f"Ignoring '{relative_path_str or name}' due to ignore patterns")
+            return True
         return False
 
+    def _name_ignored_impl(self, name: str, is_dir: bool) -> bool:
+        """Basename check; wrapped per instance in an LRU cache as self._name_ignored."""
+        return self._glob_ignored(name, is_dir)
+
+    def _glob_ignored(self, text: str, is_dir: bool) -> bool:
+        if self._ignore_re is not None and self._ignore_re.match(text): return True
+        return is_dir and self._dir_ignore_re is not None and self._dir_ignore_re.match(text) is not None
+
+    def _is_pruned(self, relative_path: str, name: str, is_dir: bool, inside_included: bool) -> bool:
+        """
+        Check an entry against the optional include/exclude globs.
+        Excluded entries are dropped with their subtree. With include globs, files that
+        don't match are dropped, and so are directories that neither match nor could
+        contain a match (judged by the patterns' literal prefixes). Nothing below a
+        directory that matched an include glob is dropped for include reasons.
+        """
+        if self.exclude_matcher and self.exclude_matcher.matches(relative_path, name):
+            return True
+        if self.include_matcher is None or inside_included:
+            return False
+        if self.include_matcher.matches(relative_path, name):
+            return False
+        if not is_dir:
+            return True
+        if self._include_prefixes is None:
+            return False # A basename pattern could still match somewhere below
+        dir_prefix = (relative_path.lower() if _GLOB_CASE_INSENSITIVE else relative_path) + "/"
+        return not any(dir_prefix.startswith(p) or p.startswith(dir_prefix) for p in self._include_prefixes)
+
     def scan_directory_sync(self) -> List[FileNode]: # Removed root_path arg, use self.root_path
         """
         Scans the configured root directory structure synchronously and returns the tree.
         Raises exceptions on major errors (e.g., root not found).
         """
         logger.info(f"[Sync Scan] Starting for: {self.root_path}")
-        self._is_cancelled.clear()
+        # _is_cancelled is not cleared here: a cancel() issued before the scan starts must still stop it
         if not self.root_path.is_dir(): raise ValueError(f"Provided path is not a valid directory: {self.root_path}")
-        root_node = self._scan_recursive(self.root_path)
+        with ThreadPoolExecutor(max_workers=self.MAX_SCAN_WORKERS, thread_name_prefix="fs-scan") as executor:
+            self._executor = executor
+            try: root_node = self._scan_recursive(self.root_path)
+            finally: self._executor = None
         results = [root_node] if root_node else []
         if self._is_cancelled.is_set(): logger.info(f"[Sync Scan] Cancelled during execution for: {self.root_path}")
         else: logger.info(f"[Sync Scan] Finished successfully for: {self.root_path}")
         return results
 
-    def _scan_recursive(self, dir_path: Path) -> Optional[FileNode]:
-        """Recursive helper for scanning."""
+    def _scan_subdir_pooled(self, dir_path: Path, rel_path: str, inside_included: bool, dir_entry: os.DirEntry) -> Optional[FileNode]:
+        try: return self._scan_recursive(dir_path, rel_path, inside_included, dir_entry)
+        finally: self._pool_slots.release()
+
+    def _scan_recursive(self, dir_path: Path, rel_path: str = "", inside_included: bool = False,
+                        dir_entry: Optional[os.DirEntry] = None) -> Optional[FileNode]:
+        """
+        Recursive helper for scanning. rel_path is dir_path's POSIX path relative to the root;
+        inside_included is set once an ancestor matched an include glob.
+        Below the root, dir_path comes from the parent's scandir entry (dir_entry): it is already
+        absolute and symlink-free (the root is resolved, symlinked entries are never descended into)
+        and has passed the ignore checks, so neither resolve() nor a second is_ignored() is needed.
+        """
         if self._is_cancelled.is_set(): return None
-        resolved_dir_path = dir_path.resolve()
-        is_root = (resolved_dir_path == self.root_path)
-        # Check ignore status *before* stating the directory (avoids stating ignored dirs)
-        # Note: is_ignored already checks for symlinks.
-        if not is_root and self.is_ignored(resolved_dir_path, is_dir=True):
-             return None
+        is_root = dir_entry is None
 
         try:
-            dir_stat = resolved_dir_path.stat()
-            dir_node = FileNode(path=resolved_dir_path, name=resolved_dir_path.name, is_dir=True, mod_time=dir_stat.st_mtime)
-            if not is_root: self._emit_progress(f"Scanning: {resolved_dir_path.name}")
+            if is_root: dir_node = FileNode(path=dir_path, name=dir_path.name, is_dir=True, mod_time=dir_path.stat().st_mtime, rel_path=rel_path)
+            else: dir_node = FileNode.from_direntry(dir_entry, rel_path, is_dir=True) # type: ignore[arg-type]
+            if not is_root: self._emit_progress(f"Scanning: {dir_path.name}")
 
-            child_nodes: List[FileNode] = []
-            try: entries = list(os.scandir(resolved_dir_path))
+            child_nodes: List[FileNode] = []; pending_subdirs: List[Future] = []
+            # Entries are listed up front (as os.walk does internally) so the directory handle is closed
+            # before descending; the with-block also closes it if listing fails part-way
+            try:
+                with os.scandir(dir_path) as it: entries = list(it)
             except OSError as scandir_err:
-                 logger.warning(f"Could not scan directory contents {resolved_dir_path}: {scandir_err}")
-                 self._emit_error(f"Access Error scanning: {resolved_dir_path.name}")
+                 logger.warning(f"Could not scan directory contents {dir_path}: {scandir_err}")
+                 self._emit_error(f"Access Error scanning: {dir_path.name}")
                  return dir_node # Return dir node even if contents unreadable
 
             for entry in entries:
                 if self._is_cancelled.is_set(): return None
-                entry_path_abs = Path(entry.path).resolve() # Resolve early for checks
 
                 # Fixes Polish P-1: Check symlink *before* is_dir/is_file which might follow it
                 try:
@@ -124,31 +234,47 @@ class _FileScannerCore:
                      self._emit_error(f"Permission error checking symlink entry: {entry.name}")
                      continue
 
-                # Now check if ignored based on patterns (using resolved path)
-                entry_is_dir_flag = entry.is_dir() # Check type *after* symlink check
-                if self.is_ignored(entry_path_abs, entry_is_dir_flag):
+                # Now check if ignored based on patterns (symlinks are already ruled out above)
+                # Relative path is built by string join from the parent's, no Path arithmetic needed
+                entry_rel_path = f"{rel_path}/{entry.name}" if rel_path else entry.name
+                # Check type *after* symlink check. follow_symlinks=False (equivalent here, symlinks are
+                # already skipped) lets is_dir/is_file/stat share the one cached lstat where d_type is unknown
+                entry_is_dir_flag = entry.is_dir(follow_symlinks=False)
+                if self._matches_ignore_patterns(entry.name, entry_rel_path, entry_is_dir_flag):
+                    continue
+                if self._is_pruned(entry_rel_path, entry.name, entry_is_dir_flag, inside_included):
                     continue
 
-                # Process directories and files
+                # Process directories and files; a Path is only built for entries that survive filtering
                 if entry_is_dir_flag:
-                    sub_dir_node = self._scan_recursive(entry_path_abs) # Pass resolved path
+                    sub_inside_included = inside_included or (
+                        self.include_matcher is not None
+                        and self.include_matcher.matches(entry_rel_path, entry.name)
+                    )
+                    entry_path = Path(entry.path)
+                    if self._executor is not None and self._pool_slots.acquire(blocking=False):
+                        pending_subdirs.append(self._executor.submit(self._scan_subdir_pooled, entry_path, entry_rel_path, sub_inside_included, entry))
+                        continue
+                    sub_dir_node = self._scan_recursive(entry_path, entry_rel_path, sub_inside_included, entry)
                     if sub_dir_node: sub_dir_node.parent = dir_node; child_nodes.append(sub_dir_node)
-                elif entry.is_file(): # Check is_file *after* symlink and ignore checks
+                elif entry.is_file(follow_symlinks=False): # Check is_file *after* symlink and ignore checks
                     try:
-                        file_stat = entry_path_abs.stat() # Use resolved path
-                        file_node = FileNode(path=entry_path_abs, name=entry.name, is_dir=False, size=file_stat.st_size, mod_time=file_stat.st_mtime, parent=dir_node)
-                        child_nodes.append(file_node)
+                        child_nodes.append(FileNode.from_direntry(entry, entry_rel_path, is_dir=False, parent=dir_node))
                     except OSError as stat_err:
-                        logger.warning(f"Could not stat file {entry_path_abs}: {stat_err}")
+                        logger.warning(f"Could not stat file {entry.path}: {stat_err}")
                         self._emit_error(f"Access Error stating: {entry.name}")
                 # else: ignore other types
 
+            for future in pending_subdirs:
+                sub_dir_node = future.result()
+                if sub_dir_node: sub_dir_node.parent = dir_node; child_nodes.append(sub_dir_node)
+            if self._is_cancelled.is_set(): return None
             dir_node.children = sorted(child_nodes, key=lambda n: (not n.is_dir, n.name.lower()))
             return dir_node
 
         except OSError as e:
-            logger.warning(f"Could not stat directory {resolved_dir_path}: {e}")
-            self._emit_error(f"Access Error stating dir: {resolved_dir_path.name}")
+            logger.warning(f"Could not stat directory {dir_path}: {e}")
+            self._emit_error(f"Access Error stating dir: {dir_path.name}")
             return None
 
     def cancel(self):
@@ -168,18 +294,26 @@ class FileScannerTask(QRunnable):
     def __init__(self, root_path: Path, ignore_patterns: List[str]):
         super().__init__(); self.root_path = root_path; self.ignore_patterns = ignore_patterns
         self.signals = FileScannerSignals(); self.scanner_core: Optional[_FileScannerCore] = None
+        self._cancelled = threading.Event() # Set by cancel(), even before run() has created the core
+        self._done = threading.Event() # Set when run() returns
         self.setAutoDelete(True)
     @Slot()
     def run(self) -> None:
         try:
-            self.scanner_core = _FileScannerCore(root_path=self.root_path, ignore_patterns=self.ignore_patterns,
-                                                 progress_callback=self.signals.progress.emit, error_callback=self.signals.error.emit)
-            results = self.scanner_core.scan_directory_sync()
-            if self.scanner_core._is_cancelled.is_set(): self.signals.error.emit("Scan cancelled")
+            if self._cancelled.is_set(): self.signals.error.emit("Scan cancelled"); return # Cancelled while queued
+            core = self.scanner_core = _FileScannerCore(root_path=self.root_path, ignore_patterns=self.ignore_patterns,
+                                                        progress_callback=self.signals.progress.emit, error_callback=self.signals.error.emit)
+            if self._cancelled.is_set(): core.cancel() # cancel() ran before scanner_core was assigned
+            results = core.scan_directory_sync()
+            if core._is_cancelled.is_set(): self.signals.error.emit("Scan cancelled")
             else: self.signals.finished.emit(results)
         except ValueError as ve: logger.error(f"Scan Error for {self.root_path}: {ve}"); self.signals.error.emit(str(ve))
         except Exception as e: logger.exception(f"Unexpected error during file scan task for {self.root_path}: {e}"); self.signals.error.emit(f"Unexpected Scan Error: {e}")
-        finally: self.scanner_core = None
+        finally: self.scanner_core = None; self._done.set()
     def cancel(self):
         logger.info(f"Cancellation signal received for scan task: {self.root_path}")
-        if self.scanner_core: self.scanner_core.cancel()
\ No newline at end of file
+        self._cancelled.set(); core = self.scanner_core
+        if core: core.cancel()
+    def wait_for_cancellation(self, timeout_ms: int) -> bool:
+        """Waits up to timeout_ms for run() to return; False if it is still running (or never started)."""
+        return self._done.wait(timeout_ms / 1000)
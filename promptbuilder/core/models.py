@@ -1,9 +1,11 @@
 # promptbuilder/core/models.py
+import os
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional, List, Dict, Set
 
-@dataclass
+# slots=True: scans create one node per entry, so drop the per-instance __dict__
+@dataclass(slots=True)
 class FileNode:
     """Represents a file or directory in the scanned tree."""
     path: Path
@@ -11,28 +13,44 @@ class FileNode:
     is_dir: bool
     size: int = 0 # Size in bytes, 0 for directories
     mod_time: float = 0.0 # Modification time (timestamp)
+    rel_path: str = "" # POSIX path relative to the scan root (set by the scanner, "" for the root)
     children: List['FileNode'] = field(default_factory=list)
     parent: Optional['FileNode'] = None # Optional link back to parent
     # Add state for UI if needed (e.g., checked status), though better in ViewModel
     # checked: bool = False
+    _hash: int = field(init=False, repr=False, compare=False) # hash(path), computed once; path never changes
+
+    def __post_init__(self):
+        self._hash = hash(self.path)
+
+    @classmethod
+    def from_direntry(cls, entry: os.DirEntry, rel_path: str, is_dir: bool, parent: Optional['FileNode'] = None) -> 'FileNode':
+        """
+        Builds a node from a scandir entry without statting the path again: on Windows the entry
+        already carries the metadata from the directory listing; elsewhere it is one cached lstat.
+        Raises OSError if that stat fails.
+        """
+        st = entry.stat(follow_symlinks=False)
+        return cls(path=Path(entry.path), name=entry.name, is_dir=is_dir, size=0 if is_dir else st.st_size,
+                   mod_time=st.st_mtime, rel_path=rel_path, parent=parent)
 
     # Allow hashing based on path for use in sets
     def __hash__(self):
-        return hash(self.path)
+        return self._hash
 
     def __eq__(self, other):
         if not isinstance(other, FileNode):
             return NotImplemented
         return self.path == other.path
 
-@dataclass
+@dataclass(slots=True)
 class PromptSnippet:
     """Represents a selected instruction snippet."""
     category: str
     name: str # e.g., "Concept", "High-level", "Custom"
     text: str # The actual text of the snippet
 
-@dataclass
+@dataclass(slots=True)
 class ContextFile:
     """Represents a file included in the context."""
     path: Path
@@ -1,7 +1,9 @@
 # promptbuilder/core/plugins.py
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Type
 import importlib.metadata
+import threading
 from loguru import logger
 
 from .models import ContextResult # Or maybe just return string/FileNode list?
@@ -26,6 +28,9 @@ class ContextProvider(ABC):
 
 # --- Plugin Registry ---
 _plugin_registry: Dict[str, Type[ContextProvider]] = {}
+# Plugin modules may call register_plugin at import time, and load_plugins imports them on worker threads
+_registry_lock = threading.Lock()
+MAX_PLUGIN_LOAD_WORKERS = 8
 
 def register_plugin(cls: Type[ContextProvider]):
     """Decorator or function to register a plugin class."""
@@ -34,13 +39,19 @@ def register_plugin(cls: Type[ContextProvider]):
     if not cls.name or cls.name == "Unnamed Provider":
          raise ValueError(f"Plugin {cls.__name__} must define a unique 'name' attribute.")
 
-    if cls.name in _plugin_registry:
-        logger.warning(f"Plugin name conflict: '{cls.name}' already registered. Overwriting.")
-    _plugin_registry[cls.name] = cls
+    with _registry_lock:
+        if cls.name in _plugin_registry:
+            logger.warning(f"Plugin name conflict: '{cls.name}' already registered. Overwriting.")
+        _plugin_registry[cls.name] = cls
     logger.info(f"Registered context provider plugin: '{cls.name}'")
+    return cls # So the decorated name still refers to the class
 
 def load_plugins(entry_point_group="promptbuilder.context_providers"):
-    """Discovers and loads plugins using importlib.metadata entry points."""
+    """
+    Discovers and loads plugins using importlib.metadata entry points.
+    Entry points are imported concurrently, so a plugin module's import-time code must be thread-safe;
+    they are still registered one at a time, in entry point order.
+    """
     global _plugin_registry
     logger.info(f"Discovering plugins using entry point group: '{entry_point_group}'")
 
@@ -51,18 +62,25 @@ def load_plugins(entry_point_group="promptbuilder.context_providers"):
          entry_points = [] # Continue without entry points if error occurs
 
 
+    entry_points = list(entry_points)
+    # Overlap the plugin module imports; each result is collected in order below
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_PLUGIN_LOAD_WORKERS, len(entry_points)))) as executor:
+        futures = [executor.submit(ep.load) for ep in entry_points]
+
     loaded_count = 0
-    for ep in entry_points:
+    for ep, future in zip(entry_points, futures):
         try:
-            plugin_class = ep.load()
+            plugin_class = future.result()
             if issubclass(plugin_class, ContextProvider):
                  # Use the class's name attribute as the key
                  plugin_name = getattr(plugin_class, 'name', None)
                  if plugin_name and plugin_name != "Unnamed Provider":
-                     if plugin_name in _plugin_registry:
+                     with _registry_lock:
+                         conflict = plugin_name in _plugin_registry
+                         if not conflict: _plugin_registry[plugin_name] = plugin_class
+                     if conflict:
                          logger.warning(f"Plugin name conflict via entry point: '{plugin_name}' already registered. Skipping {ep.name}.")
                      else:
-                         _plugin_registry[plugin_name] = plugin_class
                          logger.info(f"Loaded plugin '{plugin_name}' from entry point '{ep.name}'")
                          loaded_count += 1
                  else:
@@ -1,5 +1,5 @@
 # promptbuilder/core/prompt_engine.py
-from typing import Dict, Set, Optional
+from typing import Dict, Set, Optional, Tuple
 from loguru import logger
 
 from ..config.loader import get_config
@@ -12,6 +12,17 @@ class PromptEngine:
         self.config = get_config()
         self.snippet_definitions = self.config.prompt_snippets
         self.common_questions_list = self.config.common_questions
+        # Definitions don't change after startup: precompute tags and indented snippet lines once
+        # (category, "    <tag>", "    </tag>", {item name: indented line, or "" if the text is empty})
+        plan = []
+        for category, snippet_category in self.snippet_definitions.items():
+            tag = category.lower().replace(" ", "_") # Lowercase tag name, spaces -> _
+            snippet_lines = {name: f"        {text}" if text else "" for name, text in snippet_category.items.items()}
+            plan.append((category, f"    <{tag}>", f"    </{tag}>", snippet_lines))
+        self._category_plan: Tuple[Tuple[str, str, str, Dict[str, str]], ...] = tuple(plan)
+        # Question text -> (position in config, indented line); the selection is ordered by position
+        self._question_order: Dict[str, Tuple[int, str]] = {}
+        for i, q in enumerate(self.common_questions_list): self._question_order.setdefault(q, (i, f"        {q}"))
         logger.debug("PromptEngine initialized.")
 
     def build_instructions_xml(
@@ -23,49 +34,37 @@ class PromptEngine:
         lines = []
         lines.append("<instructions>")
 
-        # Order categories based on config definition order (or alphabetical)
-        category_order = list(self.snippet_definitions.keys())
-
-        # 1) Normal snippet categories
-        for category in category_order:
-            if category not in selected_snippets:
-                continue
-
-            items_chosen = selected_snippets[category]
+        # 1) Normal snippet categories, in config definition order
+        for category, open_tag, close_tag, snippet_lines in self._category_plan:
+            items_chosen = selected_snippets.get(category)
             if not items_chosen:
                 continue
 
-            # Use lowercase tag name, handle spaces if needed (e.g., replace with _)
-            cat_lower = category.lower().replace(" ", "_")
-            lines.append(f"    <{cat_lower}>")
-
-            # Order items within category (e.g., definition order or alpha)
-            # For simplicity, using the order they appear in the input dict here
+            lines.append(open_tag)
+            # Items in the order they appear in the input dict
             for item_name, custom_text in items_chosen.items():
-                if item_name == "Custom" and custom_text:
-                    # Indent custom text properly, handle multi-line
-                    indented_text = "\n".join(f"        {line}" for line in custom_text.strip().splitlines())
-                    lines.append(indented_text)
-                elif item_name != "Custom":
-                    # Look up the standard snippet text
-                    try:
-                        snippet_text = self.snippet_definitions[category].items[item_name]
-                        if snippet_text: # Ensure snippet text exists
-                             lines.append(f"        {snippet_text}")
-                        else:
-                             logger.warning(f"Empty snippet text for {category}/{item_name}")
-                    except KeyError:
-                        logger.error(f"Definition missing for snippet: {category}/{item_name}")
+                if item_name == "Custom":
+                    if custom_text:
+                        # Indent custom text properly, handle multi-line
+                        lines.append("\n".join(f"        {line}" for line in custom_text.strip().splitlines()))
+                    continue
+                snippet_line = snippet_lines.get(item_name)
+                if snippet_line:
+                    lines.append(snippet_line)
+                elif snippet_line is None:
+                    logger.error(f"Definition missing for snippet: {category}/{item_name}")
+                else:
+                    logger.warning(f"Empty snippet text for {category}/{item_name}")
 
-            lines.append(f"    </{cat_lower}>")
+            lines.append(close_tag)
 
         # 2) Additional questions
         if selected_questions:
             lines.append("    <questions>")
             # Ensure consistent order for questions
-            for qtext in self.common_questions_list:
-                if qtext in selected_questions:
-                    lines.append(f"        {qtext}")
+            # Only the selected questions are touched: intersect in C, then sort by config position
+            question_order = self._question_order
+            lines.extend(line for _, line in sorted(question_order[q] for q in selected_questions & question_order.keys()))
             lines.append("    </questions>")
 
         lines.append("</instructions>")
@@ -0,0 +1,144 @@
+# promptbuilder/core/token_cache.py
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from .token_counter import count_tokens_batch_sync, _get_cached_encoder, DEFAULT_ENCODING
+
+# blake3 is faster, but hashlib's blake2b is always there
+try:
+    import blake3
+    BLAKE3_AVAILABLE = True
+except ImportError:
+    blake3 = None # type: ignore
+    BLAKE3_AVAILABLE = False
+
+_SQL_VARS_PER_QUERY = 500 # Stays under SQLite's bound-parameter limit (999 on older builds)
+_SCHEMA_VERSION = 2 # PRAGMA user_version; a cache with another version is dropped and rebuilt
+_TOUCH_INTERVAL = 24 * 3600 # A hit only rewrites its row's last-used time once this stale (seconds)
+
+def _content_digest(text: str) -> bytes:
+    data = text.encode("utf-8", "surrogatepass")
+    if BLAKE3_AVAILABLE:
+        return blake3.blake3(data).digest()[:16] # type: ignore[union-attr]
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+class TokenCountCache:
+    """
+    Persistent (content hash, encoding) -> token count cache in SQLite.
+    Token counts only depend on the text, so unchanged files skip tokenizing on later runs.
+    Every edit of a file adds a row, so rows past MAX_ROWS are pruned, least recently used first,
+    each time the cache is opened.
+    """
+    MAX_ROWS = 200_000 # Around 10 MB on disk
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        # Shared by the assembler's worker threads; the lock serializes use of the one connection
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL") # A lost cache row just means a recount
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+                self._conn.execute("DROP TABLE IF EXISTS tokens")
+                self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS tokens (digest BLOB NOT NULL, encoding TEXT NOT NULL, "
+                               "tokens INTEGER NOT NULL, used INTEGER NOT NULL, PRIMARY KEY (digest, encoding)) WITHOUT ROWID")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS tokens_used ON tokens (used)")
+            self._prune()
+
+    def _prune(self) -> None:
+        """Deletes the least recently used rows beyond MAX_ROWS (rows tied at the cutoff are kept)."""
+        cutoff = self._conn.execute("SELECT used FROM tokens ORDER BY used DESC LIMIT 1 OFFSET ?", (self.MAX_ROWS - 1,)).fetchone()
+        if cutoff is not None: # Last row kept
+            deleted = self._conn.execute("DELETE FROM tokens WHERE used < ?", cutoff).rowcount
+            logger.debug(f"Token cache: pruned {deleted} least recently used rows.")
+
+    def _lookup(self, digests: List[bytes], encoding_name: str) -> Dict[bytes, int]:
+        found: Dict[bytes, int] = {}
+        unique = list(dict.fromkeys(digests))
+        with self._lock:
+            for start in range(0, len(unique), _SQL_VARS_PER_QUERY):
+                part = unique[start:start + _SQL_VARS_PER_QUERY]
+                rows = self._conn.execute(
+                    f"SELECT digest, tokens FROM tokens WHERE encoding = ? AND digest IN ({','.join('?' * len(part))})",
+                    (encoding_name, *part))
+                found.update(rows)
+        return found
+
+    def _store(self, new_counts: Dict[bytes, int], hits: List[bytes], encoding_name: str) -> None:
+        """Inserts the new counts and marks stale hits as used now, in one transaction."""
+        now = int(time.time())
+        with self._lock:
+            # Autocommit connection (isolation_level=None), so the batch's transaction is explicit
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO tokens (digest, encoding, tokens, used) VALUES (?, ?, ?, ?)",
+                                       [(digest, encoding_name, tokens, now) for digest, tokens in new_counts.items()])
+                for start in range(0, len(hits), _SQL_VARS_PER_QUERY):
+                    part = hits[start:start + _SQL_VARS_PER_QUERY]
+                    self._conn.execute(
+                        f"UPDATE tokens SET used = ? WHERE encoding = ? AND used < ? AND digest IN ({','.join('?' * len(part))})",
+                        (now, encoding_name, now - _TOUCH_INTERVAL, *part))
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def count_batch(self, texts: List[str], encoding_name: str = DEFAULT_ENCODING) -> List[int]:
+        """Same results as count_tokens_batch_sync; only texts not seen before are tokenized."""
+        digests = [_content_digest(text) for text in texts]
+        known = self._lookup(digests, encoding_name)
+        # First index of each digest not in the cache; identical texts are tokenized once
+        missing: Dict[bytes, int] = {}
+        for i, digest in enumerate(digests):
+            if digest not in known: missing.setdefault(digest, i)
+        new_rows: Dict[bytes, int] = {}
+        if missing:
+            fresh = count_tokens_batch_sync([texts[i] for i in missing.values()], encoding_name)
+            new_rows = dict(zip(missing, fresh))
+        self._store(new_rows, list(known), encoding_name)
+        known.update(new_rows)
+        logger.debug(f"Token cache: {len(texts) - len(missing)}/{len(texts)} texts not tokenized.")
+        return [known[digest] for digest in digests]
+
+    def close(self) -> None:
+        with self._lock: self._conn.close()
+
+_cache: Optional[TokenCountCache] = None
+_cache_failed = False # Don't retry opening a cache that couldn't be opened
+_cache_init_lock = threading.Lock()
+
+def get_token_cache() -> Optional[TokenCountCache]:
+    """Returns the process-wide cache in the user data dir, or None if it can't be opened."""
+    global _cache, _cache_failed
+    if _cache is not None or _cache_failed:
+        return _cache
+    with _cache_init_lock:
+        if _cache is None and not _cache_failed:
+            from ..config.paths import get_user_token_cache_file
+            try:
+                _cache = TokenCountCache(get_user_token_cache_file())
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"Token count cache unavailable, counting without it: {e}")
+                _cache_failed = True
+    return _cache
+
+def count_tokens_batch_cached(texts: List[str], encoding_name: str = DEFAULT_ENCODING) -> List[int]:
+    """count_tokens_batch_sync through the persistent cache when a real tokenizer is in use."""
+    # The character estimate is cheaper than hashing, so only tiktoken counts are worth caching
+    if not texts or _get_cached_encoder(encoding_name) is None:
+        return count_tokens_batch_sync(texts, encoding_name)
+    cache = get_token_cache()
+    if cache is None:
+        return count_tokens_batch_sync(texts, encoding_name)
+    try:
+        return cache.count_batch(texts, encoding_name)
+    except sqlite3.Error as e:
+        logger.warning(f"Token count cache error, counting without it: {e}")
+        return count_tokens_batch_sync(texts, encoding_name)
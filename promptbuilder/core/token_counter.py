@@ -1,6 +1,6 @@
 # promptbuilder/core/token_counter.py
-from functools import lru_cache
-from typing import Optional, Any # Added Any for encoder type hint flexibility
+import os
+from typing import Optional, Any, Dict, List # Added Any for encoder type hint flexibility
 from loguru import logger
 
 # --- Tiktoken Initialization ---
@@ -22,12 +22,26 @@ except Exception as e:
 
 DEFAULT_ENCODING = "cl100k_base" # Common for GPT-3.5/4
 FALLBACK_ENCODING = "gpt2"
+# With exact=False, texts shorter than this are estimated instead of tokenized
+SHORT_TEXT_BYPASS = 32
 
 # --- Core Logic (Pure Python) ---
 
-@lru_cache(maxsize=4) # Cache a few loaded encoder objects
+# Loaded encoders by name (None when loading failed). There are only ever one or two, and a plain
+# dict lookup is cheaper than an lru_cache wrapper on the per-call path.
+_ENCODER_CACHE: Dict[str, Optional[Any]] = {}
+
 def _get_cached_encoder(encoding_name: str) -> Optional[Any]:
     """Internal helper to load and cache encoder objects."""
+    try:
+        return _ENCODER_CACHE[encoding_name]
+    except KeyError:
+        pass
+    encoder = _load_encoder(encoding_name)
+    _ENCODER_CACHE[encoding_name] = encoder
+    return encoder
+
+def _load_encoder(encoding_name: str) -> Optional[Any]:
     if not TIKTOKEN_AVAILABLE:
         logger.trace(f"Tiktoken unavailable, cannot get encoder '{encoding_name}'.")
         return None
@@ -41,24 +55,26 @@ def _get_cached_encoder(encoding_name: str) -> Optional[Any]:
         if encoding_name == FALLBACK_ENCODING: # Avoid infinite recursion if fallback fails
              logger.error(f"Fallback encoder '{FALLBACK_ENCODING}' also failed. No encoder available.")
              return None
-        # Try fallback (recursive call, but cache prevents repeated load attempts for the *same* name)
-        # The result of the fallback call will also be cached under the fallback name.
+        # Try fallback; the cache prevents repeated load attempts for the *same* name,
+        # and the fallback result is cached under both names.
         return _get_cached_encoder(FALLBACK_ENCODING)
 
-def count_tokens_sync(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+def count_tokens_sync(text: str, encoding_name: str = DEFAULT_ENCODING, exact: bool = True) -> int:
     """
     Counts tokens in a string using the specified tiktoken encoding (synchronous).
     Falls back to character estimation if tiktoken fails or is unavailable.
+    exact=False lets short texts (< SHORT_TEXT_BYPASS chars) skip the tokenizer with an estimate.
     """
     if not text:
         return 0
+    if not exact and len(text) < SHORT_TEXT_BYPASS:
+        return max(1, len(text) // 4)
 
     encoder = _get_cached_encoder(encoding_name)
 
     if encoder:
         try:
-            tokens = encoder.encode(text)
-            return len(tokens)
+            return len(encoder.encode(text))
         except Exception as e:
             # Log error but still fallback to estimation
             logger.error(f"Error encoding text for token count with '{encoding_name}': {e}")
@@ -72,11 +88,37 @@ def count_tokens_sync(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
         # logger.debug(f"tiktoken unavailable, using character-based estimation: {estimated_tokens} tokens.")
         return estimated_tokens
 
+# Texts per encode_batch call; bounds how many token lists are alive at once
+_BATCH_SIZE = 32
+
+def count_tokens_batch_sync(texts: List[str], encoding_name: str = DEFAULT_ENCODING) -> List[int]:
+    """
+    Counts tokens for many strings, same results and fallbacks as count_tokens_sync per text,
+    but with one tiktoken encode_batch call per chunk (spread over threads by tiktoken itself).
+    """
+    encoder = _get_cached_encoder(encoding_name)
+    if not encoder:
+        return [len(text) // 4 for text in texts]
+    counts: List[int] = []
+    for start in range(0, len(texts), _BATCH_SIZE):
+        chunk = texts[start:start + _BATCH_SIZE]
+        try:
+            counts.extend(len(tokens) for tokens in encoder.encode_batch(chunk, num_threads=os.cpu_count() or 1))
+        except Exception as e:
+            # One bad text fails the whole batch; redo this chunk one by one to isolate it
+            logger.debug(f"Batch token count failed with '{encoding_name}', counting individually: {e}")
+            counts.extend(count_tokens_sync(text, encoding_name) for text in chunk)
+    return counts
+
 # --- Alias for backward compatibility / simpler usage ---
 # Fixes critical issue #1: Call sites expecting count_tokens
-def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING, exact: bool = True) -> int:
     """Public alias for count_tokens_sync."""
-    return count_tokens_sync(text, encoding_name)
+    return count_tokens_sync(text, encoding_name, exact)
+
+def count_tokens_batch(texts: List[str], encoding_name: str = DEFAULT_ENCODING) -> List[int]:
+    """Public alias for count_tokens_batch_sync."""
+    return count_tokens_batch_sync(texts, encoding_name)
 
 # --- Optional: Qt Adapter Task (if async counting needed for UI responsiveness) ---
 # (Remains commented out unless explicitly needed)
@@ -1,15 +1,52 @@
 # promptbuilder/plugins/git_diff.py
+import codecs
+import html
+import io
 import subprocess
+import tempfile
+from xml.sax.saxutils import escape
+from dataclasses import replace
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 
 from loguru import logger
 
 from ..core.plugins import ContextProvider, register_plugin
 from ..core.models import ContextResult, ContextFile
+from ..core.context_assembler import TRUNCATION_MARKER
 # Fixes critical issue #1: Use the correct (or aliased) function name
 from ..core.token_counter import count_tokens # Use alias or count_tokens_sync
 
+DEFAULT_MAX_DIFF_BYTES = 50_000_000 # Larger diffs are truncated rather than held in memory
+GIT_WAIT_TIMEOUT = 60 # Seconds to wait for git to exit once stdout is drained
+_READ_CHUNK = 1 << 16
+
+# Last staged diff per (repo, repo_path option, max_bytes), with the repo state it was taken at.
+# Only staged diffs are cached: they depend on HEAD and the index alone, while an unstaged diff
+# also depends on every working tree file, which nothing short of running git diff can check.
+_STAGED_DIFF_CACHE: Dict[Tuple[Path, str, int], Tuple[Tuple, ContextResult]] = {}
+
+def _staged_diff_state(repo_path: Path) -> Optional[Tuple]:
+    """(HEAD sha, index mtime_ns/size/inode) or None if it can't be determined."""
+    try:
+        index_stat = (repo_path / ".git" / "index").stat()
+        index_state = (index_stat.st_mtime_ns, index_stat.st_size, index_stat.st_ino)
+    except FileNotFoundError:
+        index_state = None # Nothing staged yet
+    except OSError:
+        return None
+    try:
+        # -q --verify prints nothing (exit 1) on an unborn branch; "" is still a valid state then
+        head = subprocess.run(["git", "rev-parse", "-q", "--verify", "HEAD"], cwd=repo_path,
+                              capture_output=True, timeout=GIT_WAIT_TIMEOUT, shell=False)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return (head.stdout.strip(), index_state)
+
+def _copy_result(result: ContextResult) -> ContextResult:
+    # Callers may mutate what they get back; keep the cached lists and files to ourselves
+    return replace(result, included_files=[replace(f) for f in result.included_files], skipped_files=list(result.skipped_files))
+
 @register_plugin # Register this plugin automatically if this module is imported
 class GitDiffProvider(ContextProvider):
     name: str = "git_diff" # Unique name for this provider
@@ -19,7 +56,10 @@ class GitDiffProvider(ContextProvider):
         logger.info("GitDiffProvider: Generating context...")
         options = options or {}
         repo_path_str = options.get("repo_path", ".") # Get repo path from options
-        repo_path = Path(repo_path_str).resolve()
+        repo_path = Path(repo_path_str)
+        # Absolute paths (what callers store in config) are used as given; resolve() walks symlinks with
+        # a syscall per component. Relative ones still are resolved so they don't depend on a later cwd.
+        if not repo_path.is_absolute(): repo_path = repo_path.resolve()
         staged = options.get("staged", False) # Option for `git diff --staged`
 
         if not (repo_path / ".git").is_dir():
@@ -34,32 +74,50 @@ class GitDiffProvider(ContextProvider):
             command.append("--staged")
 
         try:
-            # Use shell=True on Windows if git might be a .cmd or .bat file,
-            # but generally safer to rely on it being in PATH directly.
-            process = subprocess.run(
-                command,
-                cwd=repo_path,
-                capture_output=True,
-                text=True,
-                encoding='utf-8',
-                errors='replace', # Handle potential decoding errors
-                check=False, # Don't raise exception on non-zero exit code
-                shell=False # Avoid shell=True unless necessary
-            )
-
-            if process.returncode != 0:
-                error_msg = process.stderr.strip() or f"Git command failed with code {process.returncode}"
+            # Stream stdout into one buffer and decode it once; stop reading past max_bytes.
+            # stderr goes to a temp file so a chatty stderr can't block git while we drain stdout.
+            max_bytes = int(options.get("max_bytes", DEFAULT_MAX_DIFF_BYTES))
+            cache_key = (repo_path, repo_path_str, max_bytes)
+            state = _staged_diff_state(repo_path) if staged else None
+            if state is not None:
+                cached = _STAGED_DIFF_CACHE.get(cache_key)
+                if cached is not None and cached[0] == state:
+                    logger.info("GitDiffProvider: HEAD and index unchanged, reusing the previous staged diff.")
+                    return _copy_result(cached[1])
+            out = bytearray(); truncated = False
+            with tempfile.TemporaryFile() as err_f:
+                # Use shell=True on Windows if git might be a .cmd or .bat file,
+                # but generally safer to rely on it being in PATH directly.
+                with subprocess.Popen(command, cwd=repo_path, stdout=subprocess.PIPE, stderr=err_f, shell=False) as proc:
+                    while chunk := proc.stdout.read(_READ_CHUNK): # type: ignore[union-attr]
+                        out += chunk
+                        if len(out) > max_bytes:
+                            truncated = True; proc.kill(); break
+                    try: returncode = proc.wait(timeout=GIT_WAIT_TIMEOUT)
+                    except subprocess.TimeoutExpired: proc.kill(); raise # Popen.__exit__ would otherwise wait forever
+                err_f.seek(0); stderr_bytes = err_f.read()
+
+            if returncode != 0 and not truncated:
+                error_msg = stderr_bytes.decode('utf-8', 'replace').strip() or f"Git command failed with code {returncode}"
                 logger.error(f"GitDiffProvider: {error_msg}")
                 # Escape error message for XML
-                import html
                 safe_error_msg = html.escape(error_msg)
                 return ContextResult(
                     context_xml=f"<context><error>Git diff failed: {safe_error_msg}</error></context>",
                     included_files=[], skipped_files=[], total_tokens=0, budget_details="Git Error"
                 )
 
-            diff_content = process.stdout
-            if not diff_content.strip():
+            if truncated:
+                del out[max_bytes:]
+                logger.warning(f"GitDiffProvider: Diff exceeds {max_bytes} bytes, truncating.")
+            # Incremental decoder without final=True drops a multi-byte char cut at the cap
+            diff_content = codecs.getincrementaldecoder('utf-8')('replace').decode(out, final=not truncated)
+            del out
+            if "\r" in diff_content: # Match text-mode subprocess output: universal newlines
+                diff_content = diff_content.replace("\r\n", "\n").replace("\r", "\n")
+            if truncated:
+                diff_content += TRUNCATION_MARKER
+            if not diff_content or diff_content.isspace(): # No strip(): it would copy the whole diff
                  diff_content = "<no changes detected>"
                  logger.info("GitDiffProvider: No changes detected.")
 
@@ -68,20 +126,16 @@ class GitDiffProvider(ContextProvider):
             # Treat the entire diff as one "file" for simplicity
             file_name = "git_diff_staged.diff" if staged else "git_diff_unstaged.diff"
             # Use the imported count_tokens function (which aliases count_tokens_sync)
-            tokens = count_tokens(diff_content)
-            # Basic escaping
-            import html
-            escaped_content = html.escape(diff_content)
-            safe_name = html.escape(file_name, quote=True)
-            safe_path = html.escape(repo_path_str, quote=True)
-
-            context_xml = (
-                "<context>\n"
-                f"    <file name='{safe_name}' path='{safe_path}' status='generated' tokens='{tokens}'>\n"
-                f"{escaped_content}\n"
-                "    </file>\n"
-                "</context>"
-            )
+            # Not exact: a placeholder like "<no changes detected>" doesn't need the tokenizer
+            tokens = count_tokens(diff_content, exact=False)
+            # Stream into one buffer; saxutils.escape only touches & < > (no quote entities needed in text)
+            buf = io.StringIO()
+            # Attributes are quoted like the assembler's <file> tags: single quotes, escaped by html.escape
+            safe_name = html.escape(file_name, quote=True); safe_path = html.escape(repo_path_str, quote=True)
+            buf.write(f"<context>\n    <file name='{safe_name}' path='{safe_path}' status='generated' tokens='{tokens}'>\n")
+            buf.write(escape(diff_content))
+            buf.write("\n    </file>\n</context>")
+            context_xml = buf.getvalue()
 
             # Create a ContextFile representation
             diff_file = ContextFile(
@@ -92,13 +146,15 @@ class GitDiffProvider(ContextProvider):
             )
 
             logger.info(f"GitDiffProvider: Generated diff context ({tokens} tokens).")
-            return ContextResult(
+            result = ContextResult(
                 context_xml=context_xml,
                 included_files=[diff_file],
                 skipped_files=[],
                 total_tokens=tokens,
                 budget_details="Git diff generated"
             )
+            if state is not None: _STAGED_DIFF_CACHE[cache_key] = (state, _copy_result(result))
+            return result
 
         except FileNotFoundError:
             logger.error("GitDiffProvider: 'git' command not found. Is Git installed and in PATH?")
@@ -108,7 +164,6 @@ class GitDiffProvider(ContextProvider):
             )
         except Exception as e:
             logger.exception(f"GitDiffProvider: Unexpected error: {e}")
-            import html
             safe_error = html.escape(str(e))
             return ContextResult(
                 context_xml=f"<context><error>Unexpected error: {safe_error}</error></context>",
@@ -120,5 +175,6 @@ class GitDiffProvider(ContextProvider):
         # Example: Define options users might set in UI or CLI
         return {
             "repo_path": {"type": "string", "default": ".", "description": "Path to the git repository."},
-            "staged": {"type": "boolean", "default": False, "description": "Show staged changes instead of unstaged."}
+            "staged": {"type": "boolean", "default": False, "description": "Show staged changes instead of unstaged."},
+            "max_bytes": {"type": "integer", "default": DEFAULT_MAX_DIFF_BYTES, "description": "Truncate diffs larger than this many bytes."}
         }
\ No newline at end of file
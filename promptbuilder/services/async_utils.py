@@ -1,4 +1,5 @@
 # promptbuilder/services/async_utils.py
+import functools
 from PySide6.QtCore import QThreadPool, QRunnable, QTimer
 from typing import Callable
 from loguru import logger
@@ -26,6 +27,18 @@ def run_in_background(runnable: QRunnable):
 # Be careful with decorators on methods in Qt classes due to metaclass interactions
 # A helper function might be safer sometimes.
 
+class _DebounceState:
+    """Per-decorated-function state: the latest call's arguments and the lazily created timer."""
+    __slots__ = ('func', 'interval_ms', 'args', 'kwargs', 'timer')
+
+    def __init__(self, func: Callable, interval_ms: int):
+        self.func = func; self.interval_ms = interval_ms
+        self.args: tuple = (); self.kwargs: dict = {}
+        self.timer: QTimer | None = None
+
+    def _fire(self):
+        self.func(*self.args, **self.kwargs)
+
 def debounce(interval_ms: int):
     """
     Decorator to debounce a function call using QTimer.
@@ -33,22 +46,19 @@ def debounce(interval_ms: int):
     Assumes the decorated function/method is called from the Qt main thread.
     """
     def decorator(func: Callable):
-        timer = None
-        last_args = []
-        last_kwargs = {}
+        state = _DebounceState(func, interval_ms)
 
+        @functools.wraps(func)
         def trigger(*args, **kwargs):
-            nonlocal timer, last_args, last_kwargs
-            last_args = args
-            last_kwargs = kwargs
-
+            # Just overwrite the stored call; the timer's slot reads it when it fires
+            state.args = args; state.kwargs = kwargs
+            timer = state.timer
             if timer is None:
-                # Create timer on first call
-                timer = QTimer()
+                # Create timer on first call, connected once to a stable bound method
+                timer = state.timer = QTimer()
                 timer.setSingleShot(True)
-                timer.setInterval(interval_ms)
-                # Use a lambda to capture the correct args/kwargs at timeout
-                timer.timeout.connect(lambda: func(*last_args, **last_kwargs)) # type: ignore
+                timer.setInterval(state.interval_ms)
+                timer.timeout.connect(state._fire)
 
             # (Re)start the timer
             timer.start()
@@ -57,4 +67,4 @@ def debounce(interval_ms: int):
         # This basic version might not work perfectly on methods without adjustments
         # Consider using a helper class instance stored on the object if needed.
         return trigger
-    return decorator
\ No newline at end of file
+    return decorator
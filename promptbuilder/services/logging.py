@@ -5,8 +5,14 @@ from pathlib import Path
 
 from ..config.paths import get_user_log_dir, is_frozen
 
+_configured = False
+
 def setup_logging(level="INFO", verbose=False):
-    """Configures logging using Loguru."""
+    """Configures logging using Loguru. Only the first call has an effect."""
+    global _configured
+    if _configured:
+        return
+    _configured = True
     log_level = "DEBUG" if verbose else level
     log_dir = get_user_log_dir()
     log_file_path = log_dir / "promptbuilder_{time:YYYY-MM-DD}.log"
@@ -26,7 +32,9 @@ def setup_logging(level="INFO", verbose=False):
         level=log_level,
         format=fmt_console,
         colorize=True,
-        enqueue=True # Make logging calls non-blocking
+        enqueue=True, # Make logging calls non-blocking (a single background writer thread)
+        backtrace=False, # Extended tracebacks and variable dumps are costly; the file log keeps them
+        diagnose=False
     )
 
     # File handler (JSON or plain text)
@@ -7,7 +7,7 @@ from loguru import logger
 from .windows.main_window import MainWindow
 from ..config.loader import load_config, save_config, get_config
 from ..services.theming import apply_theme, Theme
-# from ..core.plugins import load_plugins # No longer loaded here
+from .. import ensure_plugins_loaded
 
 def run(argv=None):
     """Initializes and runs the QApplication."""
@@ -33,7 +33,8 @@ def run(argv=None):
         # Consider a minimal QMessageBox if possible here
         return 1 # Exit if config fails critically
 
-    # Plugins are now loaded via promptbuilder/__init__.py
+    # Load plugins now that the app is committed to starting
+    ensure_plugins_loaded()
 
     # Apply theme based on config
     try:
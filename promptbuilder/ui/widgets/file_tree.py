@@ -1,24 +1,221 @@
 # promptbuilder/ui/widgets/file_tree.py
 
-import html
-import os
-import platform
-import subprocess
+import sys
 import time # For formatting modification time
 from pathlib import Path
-from typing import List, Optional, Set, Dict # Added Dict
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
 from PySide6.QtWidgets import (
-    QTreeWidget, QTreeWidgetItem, QHeaderView,  # ← add this
-    QAbstractItemView, QMenu, QTreeWidgetItemIterator, QMessageBox
+    QTreeView, QHeaderView, QAbstractItemView, QMenu, QMessageBox
 )
-from PySide6.QtCore import Qt, Signal, Slot, QPoint
-from PySide6.QtGui import QFontMetrics, QPalette, QFontDatabase, QFont, QIcon # Added FontDatabase, Font, QIcon
+from PySide6.QtCore import Qt, Signal, Slot, QPoint, QTimer, QUrl, QAbstractItemModel, QModelIndex
+from PySide6.QtGui import QFontMetrics, QPalette, QFontDatabase, QFont, QIcon, QColor, QDesktopServices # Added FontDatabase, Font, QIcon
 from loguru import logger
 
 from ...core.models import FileNode
 
-class FileTreeWidget(QTreeWidget):
+_HEADERS = ("Name", "Size", "Modified", "Path") # Path column is hidden, kept for lookups/debugging
+# flags() runs for every painted cell; combine the enum flags once
+_NODE_FLAGS = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+_CHECKABLE_NODE_FLAGS = _NODE_FLAGS | Qt.ItemFlag.ItemIsUserCheckable
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+class FileTreeModel(QAbstractItemModel):
+    """
+    Item model over the scanned FileNode graph. Nothing is copied into Qt items: the view only asks
+    for the rows it shows. Check states live in a dict (absent means unchecked).
+    """
+    # Emitted when check states change through the model (user clicks or set_check_state)
+    check_states_changed = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._root: Optional[FileNode] = None
+        self._placeholder: Optional[str] = None; self._placeholder_color: Optional[QColor] = None
+        self._check_states: Dict[FileNode, Qt.CheckState] = {} # Only checked / partially checked nodes
+        self._checked_files: Set[Path] = set() # Paths of checked files, kept in step with _check_states
+        self._rows: Dict[int, int] = {} # id(node) -> row within its parent, filled per sibling list on demand
+        self._display: Dict[int, Tuple[str, str]] = {} # id(node) -> (size, mtime) text, formatted when first shown
+
+    # --- Content ---
+    def set_root(self, root: Optional[FileNode]):
+        self.beginResetModel()
+        self._root = root; self._placeholder = None
+        self._check_states.clear(); self._checked_files.clear(); self._rows.clear(); self._display.clear()
+        self.endResetModel()
+
+    def set_placeholder(self, text: Optional[str], color: Optional[QColor] = None):
+        """Shows a single disabled row (e.g. while scanning) instead of a tree."""
+        self.beginResetModel()
+        if text is not None: self._root = None; self._check_states.clear(); self._checked_files.clear(); self._rows.clear(); self._display.clear()
+        self._placeholder = text; self._placeholder_color = color
+        self.endResetModel()
+
+    def root_node(self) -> Optional[FileNode]:
+        return self._root
+
+    def iter_nodes(self) -> Iterator[FileNode]:
+        """All nodes in pre-order (the order the tree shows them in)."""
+        if self._root is None: return
+        stack = [self._root]
+        while stack:
+            node = stack.pop(); yield node
+            stack.extend(reversed(node.children))
+
+    # --- Index plumbing ---
+    def _row_of(self, node: FileNode) -> int:
+        row = self._rows.get(id(node))
+        if row is None:
+            if node.parent is None: return 0 # The root is the only top-level row
+            for i, sibling in enumerate(node.parent.children): self._rows[id(sibling)] = i
+            row = self._rows[id(node)]
+        return row
+
+    def node_from_index(self, index: QModelIndex) -> Optional[FileNode]:
+        if not index.isValid() or self._root is None: return None
+        return index.internalPointer()
+
+    def index_for_node(self, node: FileNode, column: int = 0) -> QModelIndex:
+        return self.createIndex(self._row_of(node), column, node)
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        if not self.hasIndex(row, column, parent): return QModelIndex()
+        if not parent.isValid():
+            if self._root is None: return self.createIndex(row, column) # Placeholder row
+            return self.createIndex(row, column, self._root)
+        parent_node: FileNode = parent.internalPointer()
+        return self.createIndex(row, column, parent_node.children[row])
+
+    def parent(self, index: QModelIndex = QModelIndex()) -> QModelIndex: # type: ignore[override]
+        node = self.node_from_index(index)
+        if node is None or node.parent is None: return QModelIndex()
+        return self.index_for_node(node.parent)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.column() > 0: return 0
+        if not parent.isValid():
+            return 1 if (self._root is not None or self._placeholder is not None) else 0
+        node = self.node_from_index(parent)
+        return len(node.children) if node is not None else 0
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return len(_HEADERS)
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole: return _HEADERS[section]
+        return None
+
+    # --- Data ---
+    @staticmethod
+    def _format_size(size_bytes: int) -> str:
+        if size_bytes < 1024: return f"{size_bytes} B"
+        size = size_bytes / 1024; unit = 1
+        while size >= 1024 and unit < len(_SIZE_UNITS) - 1: size /= 1024; unit += 1
+        return f"{size:.1f} {_SIZE_UNITS[unit]}"
+
+    @staticmethod
+    def _format_mtime(mod_time: float) -> str:
+        try: return time.strftime('%Y-%m-%d %H:%M', time.localtime(mod_time))
+        except (ValueError, OverflowError, OSError): return "Invalid Date"
+
+    def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole) -> Any:
+        if not index.isValid(): return None
+        node = self.node_from_index(index); column = index.column()
+        if node is None: # Placeholder row
+            if column != 0: return None
+            if role == Qt.ItemDataRole.DisplayRole: return self._placeholder
+            if role == Qt.ItemDataRole.ForegroundRole: return self._placeholder_color
+            return None
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0: return node.name
+            if column == 3: return str(node.path)
+            if node.is_dir: return ""
+            try: texts = self._display[id(node)]
+            except KeyError: texts = self._display[id(node)] = (self._format_size(node.size), self._format_mtime(node.mod_time))
+            return texts[column - 1]
+        if column == 0:
+            if role == Qt.ItemDataRole.CheckStateRole: return self._check_states.get(node, Qt.CheckState.Unchecked)
+            if role == Qt.ItemDataRole.ToolTipRole: return str(node.path)
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlag:
+        if not index.isValid(): return Qt.ItemFlag.NoItemFlags
+        if self.node_from_index(index) is None: return Qt.ItemFlag.NoItemFlags # Placeholder: disabled
+        return _CHECKABLE_NODE_FLAGS if index.column() == 0 else _NODE_FLAGS
+
+    def setData(self, index: QModelIndex, value: Any, role: int = Qt.ItemDataRole.EditRole) -> bool:
+        if role != Qt.ItemDataRole.CheckStateRole or index.column() != 0: return False
+        node = self.node_from_index(index)
+        if node is None: return False
+        self.set_check_state(node, Qt.CheckState(value))
+        return True
+
+    # --- Check states ---
+    def check_state(self, node: FileNode) -> Qt.CheckState:
+        return self._check_states.get(node, Qt.CheckState.Unchecked)
+
+    def _store_state(self, node: FileNode, state: Qt.CheckState):
+        if state == Qt.CheckState.Unchecked: self._check_states.pop(node, None)
+        else: self._check_states[node] = state
+        if not node.is_dir:
+            if state == Qt.CheckState.Checked: self._checked_files.add(node.path)
+            else: self._checked_files.discard(node.path)
+
+    def _derived_state(self, node: FileNode) -> Qt.CheckState:
+        """Tri-state of a directory from its children; stops at the first child that differs."""
+        states = self._check_states; unchecked = Qt.CheckState.Unchecked
+        first = states.get(node.children[0], unchecked)
+        if first == Qt.CheckState.PartiallyChecked: return first
+        for child in node.children:
+            if states.get(child, unchecked) != first: return Qt.CheckState.PartiallyChecked
+        return first
+
+    def set_check_state(self, node: FileNode, state: Qt.CheckState):
+        """Checks/unchecks node and its whole subtree, then recomputes the ancestors' tri-state."""
+        if state == Qt.CheckState.PartiallyChecked: state = Qt.CheckState.Checked # Only derived, never set
+        logger.trace(f"Item '{node.name}' check state changed to: {state == Qt.CheckState.Checked}")
+        self._store_state(node, state)
+        stack = [node]; states = self._check_states; unchecked = Qt.CheckState.Unchecked
+        while stack:
+            current = stack.pop(); changed_children = False
+            for child in current.children:
+                # A child already in the target state has its whole subtree in it too (tri-state invariant)
+                if states.get(child, unchecked) == state: continue
+                self._store_state(child, state); changed_children = True
+                if child.children: stack.append(child)
+            # One range per directory; the view only repaints what is visible
+            if changed_children: self.dataChanged.emit(self.index_for_node(current.children[0]), self.index_for_node(current.children[-1]), [Qt.ItemDataRole.CheckStateRole])
+        changed = [node]; ancestor = node.parent
+        while ancestor is not None:
+            new_state = self._derived_state(ancestor)
+            if self.check_state(ancestor) == new_state: break # Nothing further up can change either
+            self._store_state(ancestor, new_state); changed.append(ancestor); ancestor = ancestor.parent
+        for changed_node in changed:
+            changed_index = self.index_for_node(changed_node)
+            self.dataChanged.emit(changed_index, changed_index, [Qt.ItemDataRole.CheckStateRole])
+        self.check_states_changed.emit()
+
+    def clear_check_states(self) -> bool:
+        """Unchecks everything; returns whether anything was checked."""
+        if not self._check_states: return False
+        parents = {node.parent for node in self._check_states}; roots = [node for node in self._check_states if node.parent is None]
+        self._check_states.clear(); self._checked_files.clear()
+        for parent_node in parents:
+            if parent_node is not None and parent_node.children:
+                self.dataChanged.emit(self.index_for_node(parent_node.children[0]), self.index_for_node(parent_node.children[-1]), [Qt.ItemDataRole.CheckStateRole])
+        for root in roots:
+            root_index = self.index_for_node(root); self.dataChanged.emit(root_index, root_index, [Qt.ItemDataRole.CheckStateRole])
+        self.check_states_changed.emit()
+        return True
+
+    def checked_nodes(self) -> Dict[FileNode, Qt.CheckState]:
+        return self._check_states
+
+    def checked_file_paths(self) -> Set[Path]:
+        return self._checked_files
+
+
+class FileTreeWidget(QTreeView):
     """Displays the file/folder structure with checkboxes."""
 
     # Signal emitted when the checked state of any item changes
@@ -26,220 +223,132 @@ class FileTreeWidget(QTreeWidget):
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.setColumnCount(4) # Name, Size, Modified, FullPath (Hidden)
-        self.setHeaderLabels(["Name", "Size", "Modified", "Path"])
+        self._model = FileTreeModel(self)
+        self.setModel(self._model)
         self.setColumnHidden(3, True) # Hide full path column
         self.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection) # Disable standard selection
         self.setAlternatingRowColors(True)
         # Fixes Polish P-4: Disable animation for potentially large trees
         self.setAnimated(False)
+        self.setUniformRowHeights(True) # Lets the view lay out rows without measuring each one
 
         fixed_font = QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
         self.setFont(fixed_font); self.header().setFont(fixed_font)
 
-        self._item_map: Dict[QTreeWidgetItem, FileNode] = {}
-        self._node_map: Dict[Path, QTreeWidgetItem] = {}
+        self._hidden_nodes: Set[FileNode] = set() # Rows currently hidden by the text filter
+        self._lower_names: List[Tuple[FileNode, str]] = [] # (node, name.lower()) in pre-order, built on first filter
 
         header = self.header()
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(1, QHeaderView.ResizeMode.Interactive)
         header.setSectionResizeMode(2, QHeaderView.ResizeMode.Interactive)
-        self.resizeColumnToContents(1); self.resizeColumnToContents(2)
+        # Size and Modified texts have a bounded width in the fixed font; size them once instead of measuring rows
+        fm = QFontMetrics(fixed_font)
+        self.setColumnWidth(1, fm.horizontalAdvance("1023.9 MB  ")); self.setColumnWidth(2, fm.horizontalAdvance("9999-99-99 99:99  "))
         self.setColumnWidth(0, 300); self.setMinimumWidth(400)
 
-        self.itemChanged.connect(self._on_item_changed)
-        self.itemExpanded.connect(lambda: self.resizeColumnToContents(0))
-        self.itemCollapsed.connect(lambda: self.resizeColumnToContents(0))
+        # Coalesce check-state changes made in one event-loop pass (e.g. several context-menu checks) into one emit
+        self._selection_emit_timer = QTimer(self)
+        self._selection_emit_timer.setInterval(0)
+        self._selection_emit_timer.setSingleShot(True)
+        self._selection_emit_timer.timeout.connect(self.item_selection_changed.emit)
+        self._model.check_states_changed.connect(self._selection_emit_timer.start)
+        # Column 0 stretches, so resizing it to contents on expand/collapse only cost a measuring pass
         self.setContextMenuPolicy(Qt.ContextMenuPolicy.CustomContextMenu)
         self.customContextMenuRequested.connect(self._show_context_menu)
 
-    # --- Helper methods (_format_size, _create_tree_item) --- (No changes needed)
-    def _format_size(self, size_bytes: int) -> str:
-        if size_bytes < 1024: return f"{size_bytes} B"
-        elif size_bytes < 1024 * 1024: return f"{size_bytes / 1024:.1f} KB"
-        else: return f"{size_bytes / (1024 * 1024):.1f} MB"
-    def _create_tree_item(self, node: FileNode, parent_item: Optional[QTreeWidgetItem] = None) -> QTreeWidgetItem:
-        item = QTreeWidgetItem(parent_item) if parent_item else QTreeWidgetItem(self)
-        item.setText(0, node.name); item.setToolTip(0, str(node.path)); item.setText(3, str(node.path))
-        if node.is_dir: item.setText(1, ""); item.setText(2, "")
-        else:
-            item.setText(1, self._format_size(node.size))
-            try: mod_time_str = time.strftime('%Y-%m-%d %H:%M', time.localtime(node.mod_time))
-            except ValueError: mod_time_str = "Invalid Date"
-            item.setText(2, mod_time_str)
-        item.setFlags(item.flags() | Qt.ItemFlag.ItemIsUserCheckable | Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable)
-        item.setCheckState(0, Qt.CheckState.Unchecked)
-        self._item_map[item] = node; self._node_map[node.path] = item
-        return item
-
-    # --- Tree Population and Management --- (No changes needed)
+    # --- Tree Population and Management ---
     def populate_tree(self, root_node: FileNode):
-        self.clear_tree(); logger.debug(f"Populating tree with root: {root_node.name}")
-        self.blockSignals(True)
+        logger.debug(f"Populating tree with root: {root_node.name}")
+        self._hidden_nodes.clear(); self._lower_names = []
+        self.setUpdatesEnabled(False) # One repaint after reset + expand instead of one each
         try:
-            stack = [(root_node, None)];
-            while stack:
-                node, parent_qt_item = stack.pop()
-                current_qt_item = self._create_tree_item(node, parent_qt_item)
-                for child_node in reversed(node.children):
-                    stack.append((child_node, current_qt_item))
-            for i in range(self.topLevelItemCount()): self.topLevelItem(i).setExpanded(True)
-            self.resizeColumnToContents(0); self.resizeColumnToContents(1); self.resizeColumnToContents(2)
-        finally: self.blockSignals(False)
+            self._model.set_root(root_node)
+            self.expand(self._model.index_for_node(root_node)) # Show the root's children, as before
+        finally:
+            self.setUpdatesEnabled(True)
         logger.debug("Tree population complete.")
     def clear_tree(self):
-        logger.debug("Clearing file tree."); self.blockSignals(True)
-        self.clear(); self._item_map.clear(); self._node_map.clear()
-        self.blockSignals(False)
+        logger.debug("Clearing file tree.")
+        self._hidden_nodes.clear(); self._lower_names = []; self._model.set_root(None)
 
     def show_loading_indicator(self, show: bool):
-        self.blockSignals(True)
-        try:
-            # ----- NEW: handle empty tree safely -----
-            if self.topLevelItemCount() == 0:
-                current_item = None
-            else:
-                current_item = self.topLevelItem(0)
-
+        if show:
+            # insert fresh placeholder (replaces any tree)
+            self._hidden_nodes.clear(); self._lower_names = []
+            self._model.set_placeholder("Scanning directory…", self.palette().color(QPalette.ColorRole.PlaceholderText))
+        elif self._model.root_node() is None:
             # remove existing “Scanning …” placeholder
-            if current_item and "Scanning" in current_item.text(0):
-                self.takeTopLevelItem(0)
-            # -----------------------------------------
-
-            if show:
-                # insert fresh placeholder
-                self.clear_tree()
-                loading_item = QTreeWidgetItem(self)
-                loading_item.setText(0, "Scanning directory…")
-                loading_item.setFlags(loading_item.flags() & ~Qt.ItemFlag.ItemIsEnabled)
-                loading_item.setForeground(
-                    0, self.palette().color(QPalette.ColorRole.PlaceholderText)
-                )
-        finally:
-            self.blockSignals(False)
+            self._model.set_placeholder(None)
 
-    # --- Checkbox Handling & Propagation --- (No changes needed)
-    @Slot(QTreeWidgetItem, int)
-    def _on_item_changed(self, item: QTreeWidgetItem, column: int):
-        if column == 0:
-            if not item or item not in self._item_map: return
-            is_checked = item.checkState(0) == Qt.CheckState.Checked; node = self._item_map.get(item)
-            if node:
-                logger.trace(f"Item '{node.name}' check state changed to: {is_checked}")
-                self.blockSignals(True)
-                try:
-                    if node.is_dir: self._set_children_check_state(item, item.checkState(0))
-                    self._update_parent_check_state(item)
-                finally: self.blockSignals(False)
-                self.item_selection_changed.emit()
-            else: logger.warning("Item changed but no corresponding FileNode found.")
-    def _set_children_check_state(self, item: QTreeWidgetItem, state: Qt.CheckState):
-        for i in range(item.childCount()): child = item.child(i);
-        if child.checkState(0) != state: child.setCheckState(0, state)
-    def _update_parent_check_state(self, item: QTreeWidgetItem):
-        parent = item.parent()
-        if not parent:
-            return
-        child_states = set()
-        has_children = False
-        for i in range(parent.childCount()):
-            has_children = True
-        child_states.add(parent.child(i).checkState(0))
-        if not has_children:
-            return
-        new_parent_state = Qt.CheckState.Unchecked
-        if len(child_states) == 1:
-            state = list(child_states)[0]
-        if state == Qt.CheckState.Checked:
-            new_parent_state = Qt.CheckState.Checked
-        elif state == Qt.CheckState.Unchecked:
-            new_parent_state = Qt.CheckState.Unchecked
-        elif state == Qt.CheckState.PartiallyChecked:
-            new_parent_state = Qt.CheckState.PartiallyChecked
-        else:
-            new_parent_state = Qt.CheckState.PartiallyChecked
-        if parent.checkState(0) != new_parent_state:
-            parent.setCheckState(0, new_parent_state)
-
-    # --- Selection Retrieval --- (No changes needed)
+    # --- Selection Retrieval ---
     def get_selected_nodes(self) -> List[FileNode]:
-        selected_nodes: List[FileNode] = []; iterator = QTreeWidgetItemIterator(self)
-        while iterator.value():
-            item = iterator.value()
-            if item.checkState(0) in (Qt.CheckState.Checked, Qt.CheckState.PartiallyChecked):
-                node = self._item_map.get(item);
-                if node: selected_nodes.append(node)
-            iterator += 1
+        checked = self._model.checked_nodes(); selected_nodes: List[FileNode] = []
+        root = self._model.root_node(); stack = [root] if root is not None and checked else []
+        while stack: # Pre-order; unchecked subtrees can't contain checked nodes and are skipped
+            node = stack.pop()
+            if node not in checked: continue
+            selected_nodes.append(node); stack.extend(reversed(node.children))
         logger.debug(f"Found {len(selected_nodes)} selected (checked or partial) nodes.")
         return selected_nodes
     def get_selected_file_paths(self) -> Set[Path]:
-        selected_files: Set[Path] = set(); iterator = QTreeWidgetItemIterator(self, QTreeWidgetItemIterator.IteratorFlag.All)
-        while iterator.value():
-            item = iterator.value()
-            if item.checkState(0) == Qt.CheckState.Checked:
-                node = self._item_map.get(item);
-                if node and not node.is_dir: selected_files.add(node.path)
-            iterator += 1
+        selected_files: Set[Path] = set(self._model.checked_file_paths()) # Copy; the model keeps updating its set
         logger.debug(f"Collected {len(selected_files)} selected file paths.")
         return selected_files
     def uncheck_all_items(self):
-        logger.debug("Unchecking all items in the tree."); changed = False; self.blockSignals(True)
-        try:
-            iterator = QTreeWidgetItemIterator(self)
-            while iterator.value():
-                item = iterator.value();
-                if item.checkState(0) != Qt.CheckState.Unchecked: item.setCheckState(0, Qt.CheckState.Unchecked); changed = True
-                iterator += 1
-        finally:
-            self.blockSignals(False)
-            if changed:
-                logger.debug("Items were unchecked, emitting selection change.")
-                self.item_selection_changed.emit()
+        logger.debug("Unchecking all items in the tree.")
+        if self._model.clear_check_states(): logger.debug("Items were unchecked, emitting selection change.")
 
-    # --- Filtering & Context Menu --- (No changes needed)
+    # --- Filtering & Context Menu ---
     def filter_tree(self, text: str):
+        """Hides rows whose name doesn't contain text, keeping the ancestors of matching rows visible."""
         filter_text = text.strip().lower(); logger.debug(f"Filtering tree view by: '{filter_text}'")
-        self.blockSignals(True)
-        try:
-            iterator = QTreeWidgetItemIterator(self, QTreeWidgetItemIterator.IteratorFlag.All)
-            while iterator.value():
-                item = iterator.value(); node = self._item_map.get(item); item_text = item.text(0).lower() if item else ""
-                should_hide = bool(filter_text) and (filter_text not in item_text)
-                # TODO: Implement proper recursive filtering that keeps parents visible if children match.
-                item.setHidden(should_hide)
-                iterator += 1
-        finally: self.blockSignals(False)
+        if not filter_text: # Unhide only what is hidden
+            for node in self._hidden_nodes: self._set_node_hidden(node, False)
+            self._hidden_nodes.clear(); return
+        if not self._lower_names: self._lower_names = [(node, node.name.lower()) for node in self._model.iter_nodes()]
+        visible: Set[FileNode] = set()
+        for node, name_lower in self._lower_names:
+            if filter_text not in name_lower: continue
+            while node is not None and node not in visible: # Stop at an ancestor another match already showed
+                visible.add(node); node = node.parent
+        hidden = {node for node, _ in self._lower_names if node not in visible}
+        # Only rows whose hidden state actually changes are touched
+        for node in self._hidden_nodes - hidden: self._set_node_hidden(node, False)
+        for node in hidden - self._hidden_nodes: self._set_node_hidden(node, True)
+        self._hidden_nodes = hidden
+    def _set_node_hidden(self, node: FileNode, hide: bool):
+        index = self._model.index_for_node(node); self.setRowHidden(index.row(), index.parent(), hide)
     @Slot(QPoint)
     def _show_context_menu(self, pos: QPoint):
-        item = self.itemAt(pos);
-        if not item: return
-        node = self._item_map.get(item);
+        index = self.indexAt(pos); node = self._model.node_from_index(index)
         if not node: return
+        index = self._model.index_for_node(node) # Column 0, where the check state lives
         menu = QMenu(self)
-        if node.is_dir: action_expand = menu.addAction("Expand All"); action_collapse = menu.addAction("Collapse All"); action_expand.triggered.connect(lambda: self.expandRecursively(item)); action_collapse.triggered.connect(lambda: self.collapseRecursively(item)); menu.addSeparator()
-        action_check = menu.addAction("Check"); action_uncheck = menu.addAction("Uncheck"); action_check.triggered.connect(lambda: self._set_item_checked_state(item, Qt.CheckState.Checked)); action_uncheck.triggered.connect(lambda: self._set_item_checked_state(item, Qt.CheckState.Unchecked)); menu.addSeparator()
+        if node.is_dir: action_expand = menu.addAction("Expand All"); action_collapse = menu.addAction("Collapse All"); action_expand.triggered.connect(lambda: self.expandRecursively(index)); action_collapse.triggered.connect(lambda: self.collapseRecursively(index)); menu.addSeparator()
+        action_check = menu.addAction("Check"); action_uncheck = menu.addAction("Uncheck"); action_check.triggered.connect(lambda: self._set_item_checked_state(node, Qt.CheckState.Checked)); action_uncheck.triggered.connect(lambda: self._set_item_checked_state(node, Qt.CheckState.Unchecked)); menu.addSeparator()
         action_open_externally = menu.addAction("Open Location"); action_open_externally.triggered.connect(lambda: self._open_item_location(node))
         menu.exec(self.mapToGlobal(pos))
-    def expandRecursively(self, item: QTreeWidgetItem):
-        if not item:
-            return
-        item.setExpanded(True)
-        for i in range(item.childCount()):
-            self.expandRecursively(item.child(i))
-    def collapseRecursively(self, item: QTreeWidgetItem):
-        if not item: return
-        for i in range(item.childCount()): self.collapseRecursively(item.child(i))
-        item.setExpanded(False)
-    def _set_item_checked_state(self, item: QTreeWidgetItem, state: Qt.CheckState):
-        if item and item.checkState(0) != state: item.setCheckState(0, state)
+    def collapseRecursively(self, index: QModelIndex):
+        # QTreeView has expandRecursively but no collapse counterpart; only expanded rows need visiting
+        if not index.isValid() or not self.isExpanded(index): return
+        for row in range(self._model.rowCount(index)): self.collapseRecursively(self._model.index(row, 0, index))
+        self.collapse(index)
+    def _set_item_checked_state(self, node: FileNode, state: Qt.CheckState):
+        if self._model.check_state(node) != state: self._model.set_check_state(node, state)
     def _open_item_location(self, node: FileNode):
         path_to_open = node.path
         try:
-            if platform.system() == "Windows":
-                if path_to_open.is_file(): subprocess.run(['explorer', '/select,', str(path_to_open)], check=True, shell=False) # Avoid shell=True if possible
-                elif path_to_open.is_dir(): subprocess.run(['explorer', str(path_to_open)], check=True, shell=False)
-                else: logger.warning(f"Cannot open location for non-file/dir: {path_to_open}"); return
-                logger.info(f"Opened location for: {path_to_open}")
-            else: logger.warning(f"Unsupported OS for opening location: {platform.system()}"); QMessageBox.information(self, "Unsupported", "Opening location is only supported on Windows.")
-        except FileNotFoundError: logger.error(f"'explorer.exe' not found? Could not open location {path_to_open}"); QMessageBox.warning(self, "Open Error", f"Could not run explorer.exe to open location.")
-        except Exception as e: logger.error(f"Failed to open location {path_to_open}: {e}"); QMessageBox.warning(self, "Open Error", f"Could not open location:\n{e}")
\ No newline at end of file
+            if not (path_to_open.is_file() or path_to_open.is_dir()): logger.warning(f"Cannot open location for non-file/dir: {path_to_open}"); return
+            if sys.platform == "win32":
+                import ctypes # Only needed for this rarely used action
+                # ShellExecuteW returns immediately; subprocess.run waited for explorer, and check=True raised
+                # because explorer exits with 1 even on success
+                params = f'/select,"{path_to_open}"' if path_to_open.is_file() else f'"{path_to_open}"'
+                result = ctypes.windll.shell32.ShellExecuteW(None, "open", "explorer.exe", params, None, 1) # SW_SHOWNORMAL
+                if result <= 32: raise OSError(f"ShellExecuteW failed with code {result}") # Values <= 32 are error codes
+            else: # No portable "select in file manager": open the containing folder
+                folder = path_to_open if path_to_open.is_dir() else path_to_open.parent
+                if not QDesktopServices.openUrl(QUrl.fromLocalFile(str(folder))): raise OSError(f"No handler to open {folder}")
+            logger.info(f"Opened location for: {path_to_open}")
+        except Exception as e: logger.error(f"Failed to open location {path_to_open}: {e}"); QMessageBox.warning(self, "Open Error", f"Could not open location:\n{e}")
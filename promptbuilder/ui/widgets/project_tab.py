@@ -131,12 +131,11 @@ class ProjectTabWidget(QWidget):
 
         if self.current_scan_task_runner:
             logger.warning("Scan already in progress, cancelling previous.")
+            previous = self.current_scan_task_runner
             self.cancel_scan()
-            # Wait briefly? Or let the new scan start immediately?
-            # QTimer.singleShot(100, self._start_scan_task) # Option to delay slightly
-            self._start_scan_task()
-        else:
-             self._start_scan_task()
+            # Give the old walk a moment to stop so both don't compete for the disk; its result is dropped either way
+            if not previous.wait_for_cancellation(timeout_ms=50): logger.debug("Previous scan still stopping, starting the new one anyway.")
+        self._start_scan_task()
 
 
     def _start_scan_task(self):
@@ -2,7 +2,7 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QGroupBox,
                              QCheckBox, QLabel, QScrollArea, QSizePolicy,
                              QDialog, QPlainTextEdit, QDialogButtonBox)
-from PySide6.QtCore import Qt, Signal, Slot
+from PySide6.QtCore import Qt, Signal, Slot, QTimer, QSignalBlocker
 from typing import Dict, List, Set, Tuple, Optional
 from functools import partial
 from loguru import logger
@@ -33,6 +33,11 @@ class CustomTextDialog(QDialog):
         button_box.rejected.connect(self.reject)
         layout.addWidget(button_box)
 
+    def reset(self, title: str, instruction: str, initial_text: str = ""):
+        """Reconfigures the dialog for another use."""
+        self.setWindowTitle(title); self.label.setText(instruction)
+        self.text_edit.setPlainText(initial_text); self.text_edit.setFocus()
+
     def get_text(self) -> str:
         return self.text_edit.toPlainText().strip()
 
@@ -60,6 +65,13 @@ class PromptPanelWidget(QWidget):
         # Store references to checkboxes for state management
         self.category_checkboxes: Dict[str, Dict[str, QCheckBox]] = {} # {Cat: {Name: CheckBox}}
         self.question_checkboxes: Dict[str, QCheckBox] = {} # {QuestionText: CheckBox}
+        self._custom_dialog: Optional[CustomTextDialog] = None # Created on first use, then reused
+
+        # Coalesce changes made in one event-loop pass into one snippets_changed (as FileTreeWidget does)
+        self._emit_timer = QTimer(self)
+        self._emit_timer.setInterval(0)
+        self._emit_timer.setSingleShot(True)
+        self._emit_timer.timeout.connect(self.snippets_changed.emit)
 
         self._setup_ui()
         logger.debug("PromptPanelWidget initialized.")
@@ -100,7 +112,7 @@ class PromptPanelWidget(QWidget):
             for item_name in item_names:
                 cb = QCheckBox(item_name)
                 # Use partial to pass category and item name to the handler
-                cb.stateChanged.connect(
+                cb.toggled.connect(
                     partial(self._on_snippet_checkbox_changed, category_name, item_name)
                 )
                 cat_group_layout.addWidget(cb)
@@ -126,7 +138,7 @@ class PromptPanelWidget(QWidget):
             # q_cb.setText(f"<html>{q_text}</html>")
             # ------------------------------------
 
-            q_cb.stateChanged.connect(
+            q_cb.toggled.connect(
                 partial(self._on_question_checkbox_changed, q_text)
             )
             questions_layout.addWidget(q_cb)
@@ -140,10 +152,9 @@ class PromptPanelWidget(QWidget):
         main_layout.setStretchFactor(questions_group, 1)
 
 
-    @Slot(str, str, int) # category_name, item_name, state
-    def _on_snippet_checkbox_changed(self, category: str, item_name: str, state: int):
+    @Slot(str, str, bool) # category_name, item_name, checked
+    def _on_snippet_checkbox_changed(self, category: str, item_name: str, is_checked: bool):
         """Handles state changes for snippet checkboxes."""
-        is_checked = (state == Qt.CheckState.Checked.value) # Use enum value for comparison
         cb = self.category_checkboxes[category][item_name]
 
         logger.debug(f"Snippet changed: {category}/{item_name}, Checked: {is_checked}")
@@ -156,11 +167,12 @@ class PromptPanelWidget(QWidget):
                 if category in self.selected_snippets and item_name in self.selected_snippets[category]:
                      existing_text = self.selected_snippets[category].get(item_name) or ""
 
-                dialog = CustomTextDialog(
+                dialog = self._custom_dialog
+                if dialog is None: dialog = self._custom_dialog = CustomTextDialog(parent=self)
+                dialog.reset(
                     title=f"Custom '{category}' Snippet",
                     instruction=f"Enter custom text for '{category}':",
-                    initial_text=existing_text,
-                    parent=self
+                    initial_text=existing_text
                 )
                 if dialog.exec() == QDialog.DialogCode.Accepted:
                     custom_text = dialog.get_text()
@@ -171,28 +183,24 @@ class PromptPanelWidget(QWidget):
                     else:
                         # User entered empty text, uncheck the box
                         logger.debug(f"Custom text empty for {category}, unchecking.")
-                        cb.blockSignals(True)
-                        cb.setChecked(False)
-                        cb.blockSignals(False)
+                        with QSignalBlocker(cb): cb.setChecked(False)
                         # Remove if it existed
                         if category in self.selected_snippets:
                             self.selected_snippets[category].pop(item_name, None)
                             if not self.selected_snippets[category]:
                                 del self.selected_snippets[category]
-                        self.snippets_changed.emit() # Emit change
+                        self._emit_timer.start() # Emit change
                         return # Don't proceed further
                 else:
                     # User cancelled the dialog, uncheck the box
                     logger.debug(f"Custom text dialog cancelled for {category}, unchecking.")
-                    cb.blockSignals(True)
-                    cb.setChecked(False)
-                    cb.blockSignals(False)
+                    with QSignalBlocker(cb): cb.setChecked(False)
                     # Remove if it existed
                     if category in self.selected_snippets:
                         self.selected_snippets[category].pop(item_name, None)
                         if not self.selected_snippets[category]:
                             del self.selected_snippets[category]
-                    self.snippets_changed.emit() # Emit change
+                    self._emit_timer.start() # Emit change
                     return # Don't proceed further
             else:
                 # Normal snippet checked, store None for custom text
@@ -206,13 +214,12 @@ class PromptPanelWidget(QWidget):
                     del self.selected_snippets[category]
 
         # Emit signal after any change
-        self.snippets_changed.emit()
+        self._emit_timer.start()
 
 
-    @Slot(str, int) # question_text, state
-    def _on_question_checkbox_changed(self, question_text: str, state: int):
+    @Slot(str, bool) # question_text, checked
+    def _on_question_checkbox_changed(self, question_text: str, is_checked: bool):
         """Handles state changes for question checkboxes."""
-        is_checked = (state == Qt.CheckState.Checked.value)
         logger.debug(f"Question changed: '{question_text[:50]}...', Checked: {is_checked}")
 
         if is_checked:
@@ -221,7 +228,7 @@ class PromptPanelWidget(QWidget):
             self.selected_questions.discard(question_text) # Use discard to avoid KeyError
 
         # Emit signal after any change
-        self.snippets_changed.emit()
+        self._emit_timer.start()
 
 
     # --- Public API ---
@@ -234,40 +241,28 @@ class PromptPanelWidget(QWidget):
     def clear_selections(self):
         """Unchecks all checkboxes and clears internal state."""
         logger.info("Clearing prompt panel selections.")
-        changed = False
+        # A box is checked exactly when it is in the selection state, so only those need unchecking
+        changed = bool(self.selected_snippets or self.selected_questions)
         self.blockSignals(True) # Block main signal during batch changes
+        self.setUpdatesEnabled(False) # One repaint for the whole batch
         try:
-            # Uncheck category checkboxes
-            for cat_name, items in self.category_checkboxes.items():
-                for item_name, cb in items.items():
-                    if cb.isChecked():
-                        cb.blockSignals(True) # Block individual signals
-                        cb.setChecked(False)
-                        cb.blockSignals(False)
-                        changed = True
-
-            # Uncheck question checkboxes
-            for q_text, q_cb in self.question_checkboxes.items():
-                if q_cb.isChecked():
-                    q_cb.blockSignals(True)
-                    q_cb.setChecked(False)
-                    q_cb.blockSignals(False)
-                    changed = True
+            checked_boxes = [self.category_checkboxes[cat_name][item_name]
+                             for cat_name, items in self.selected_snippets.items() for item_name in items]
+            checked_boxes.extend(self.question_checkboxes[q_text] for q_text in self.selected_questions)
+            for cb in checked_boxes:
+                with QSignalBlocker(cb): cb.setChecked(False) # Unblocked again even if setChecked raises
 
             # Clear internal state
-            if self.selected_snippets:
-                 self.selected_snippets.clear()
-                 changed = True
-            if self.selected_questions:
-                 self.selected_questions.clear()
-                 changed = True
+            self.selected_snippets.clear()
+            self.selected_questions.clear()
 
         finally:
+            self.setUpdatesEnabled(True)
             self.blockSignals(False)
 
         # Emit signal only if something actually changed
         if changed:
             logger.debug("Selections cleared, emitting snippets_changed.")
-            self.snippets_changed.emit()
+            self._emit_timer.start()
         else:
              logger.debug("Selections already clear, no change emitted.")
\ No newline at end of file
@@ -1,22 +1,48 @@
 # promptbuilder/ui/widgets/text_edit.py
 
+from typing import Optional
+
 from PySide6.QtWidgets import QTextEdit, QSizePolicy
 from PySide6.QtCore import Slot
-from PySide6.QtGui import QKeySequence, QFontDatabase, QTextOption
+from PySide6.QtGui import QKeySequence, QFontDatabase, QFont, QTextOption, QTextCursor, QTextDocument
+
+
+def _common_prefix_len(a: str, b: str) -> int:
+    """Length of the common prefix, by binary search over slice comparisons (done in C)."""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]: lo = mid
+        else: hi = mid - 1
+    return lo
+
+def _common_suffix_len(a: str, b: str, limit: int) -> int:
+    """Length of the common suffix, at most limit chars."""
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:len(a) - lo] == b[len(b) - mid:len(b) - lo]: lo = mid
+        else: hi = mid - 1
+    return lo
 
 
 class PromptTextEdit(QTextEdit):
     """Read-only text edit for displaying the generated prompt."""
 
+    _FIXED_FONT: Optional[QFont] = None # System fixed-width font, looked up by the first instance
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setReadOnly(True)
         self.setAcceptRichText(False) # Work with plain text
+        self.setUndoRedoEnabled(False) # Read-only: no edit history to keep
+        self.setCursorWidth(0) # Never draw (or blink) a caret in the read-only preview
+        self._last_text = "" # Text of the last setPlainText, to diff the next one against
         self.setLineWrapMode(QTextEdit.LineWrapMode.WidgetWidth) # Wrap lines
 
         # Set fixed-width font correctly using QFontDatabase
-        fixed_font = QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
-        self.setFont(fixed_font)
+        if PromptTextEdit._FIXED_FONT is None: PromptTextEdit._FIXED_FONT = QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont)
+        self.setFont(PromptTextEdit._FIXED_FONT)
 
         self.setWordWrapMode(QTextOption.WrapMode.WrapAnywhere) # Wrap long lines without spaces
 
@@ -43,7 +69,24 @@ class PromptTextEdit(QTextEdit):
     def setPlainText(self, text: str):
         """Sets the plain text content, ensuring read-only state."""
         # No need to toggle read-only state if it's always read-only
-        super().setPlainText(text)
+        old = self._last_text; self._last_text = text
+        # Rebuilds usually change one region (instructions at the top, or one file's block); replacing
+        # only the changed middle keeps Qt from rebuilding and relaying out every unchanged block
+        prefix = _common_prefix_len(old, text)
+        suffix = _common_suffix_len(old, text, min(len(old), len(text)) - prefix)
+        if old and prefix + suffix >= len(text) // 2 and self.document().characterCount() == len(old) + 1:
+            cursor = QTextCursor(self.document())
+            cursor.setPosition(prefix); cursor.setPosition(len(old) - suffix, QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(text[prefix:len(text) - suffix])
+        else:
+            # Fill a detached document and swap it in: the live one would otherwise signal and
+            # update the view through the whole replacement
+            current = self.document(); doc = QTextDocument(self)
+            doc.setDefaultFont(current.defaultFont()); doc.setDefaultTextOption(current.defaultTextOption())
+            doc.setUndoRedoEnabled(False); doc.setPlainText(text)
+            owned = current.parent() is self # Qt only deletes the editor's initial document itself
+            self.setDocument(doc)
+            if owned: current.deleteLater()
         # Move cursor to the beginning after setting text
         cursor = self.textCursor()
         cursor.movePosition(cursor.MoveOperation.Start)
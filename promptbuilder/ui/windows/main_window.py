@@ -85,7 +85,6 @@ class MainWindow(QMainWindow):
         preview_container = QWidget(); preview_layout = QVBoxLayout(preview_container); preview_layout.setContentsMargins(5,5,5,5)
         preview_label = QLabel("Generated Prompt Preview"); preview_label.setStyleSheet("font-weight: bold;"); preview_layout.addWidget(preview_label)
         self.prompt_preview_edit = PromptTextEdit()
-        fixed_font = QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont); self.prompt_preview_edit.setFont(fixed_font)
         preview_layout.addWidget(self.prompt_preview_edit)
         bottom_bar_layout = QHBoxLayout(); self.clear_button = QPushButton("Clear All"); self.copy_button = QPushButton("Copy")
         self.word_count_label = QLabel("Words: 0"); self.char_count_label = QLabel("Chars: 0"); self.token_count_label = QLabel("Tokens: 0")
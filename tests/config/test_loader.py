@@ -0,0 +1,113 @@
+# tests/config/test_loader.py
+import json
+
+import pytest
+
+from promptbuilder.config import loader, paths
+from promptbuilder.config.schema import AppConfig
+
+
+@pytest.fixture
+def user_dir(tmp_path, monkeypatch):
+    # get_user_data_dir() resolves %APPDATA%/PromptBuilder
+    monkeypatch.setenv("APPDATA", str(tmp_path))
+    monkeypatch.setattr(loader, "_cached_config", None)
+    for helper in (paths.get_user_data_dir, paths.get_user_config_file, paths.get_user_config_cache_file):
+        helper.cache_clear() # Path helpers are cached per process
+    yield tmp_path / "PromptBuilder"
+    for helper in (paths.get_user_data_dir, paths.get_user_config_file, paths.get_user_config_cache_file):
+        helper.cache_clear()
+
+
+def _write_user_config(user_dir, **overrides):
+    user_dir.mkdir(parents=True, exist_ok=True)
+    config_path = user_dir / "config.json"
+    config_path.write_text(json.dumps(overrides), encoding="utf-8")
+    return config_path
+
+
+def test_load_config_writes_and_reuses_cache(user_dir, monkeypatch):
+    _write_user_config(user_dir, max_context_tokens=1234)
+    config = loader.load_config()
+    assert config.max_context_tokens == 1234
+    assert (user_dir / "config.cache.pkl").exists()
+
+    # Second cold load must come from the cache, not from parsing config.json again
+    monkeypatch.setattr(loader, "_cached_config", None)
+    monkeypatch.setattr(loader, "_parse_json", lambda raw: pytest.fail("config.json was re-parsed"))
+    cached = loader.load_config()
+    assert isinstance(cached, AppConfig)
+    assert cached.max_context_tokens == 1234
+
+
+def test_load_config_cache_invalidated_when_file_changes(user_dir, monkeypatch):
+    config_path = _write_user_config(user_dir, max_context_tokens=1234)
+    loader.load_config()
+
+    config_path.write_text(json.dumps({"max_context_tokens": 99999}), encoding="utf-8")
+    monkeypatch.setattr(loader, "_cached_config", None)
+    assert loader.load_config().max_context_tokens == 99999
+
+
+def test_load_config_ignores_corrupt_cache(user_dir, monkeypatch):
+    _write_user_config(user_dir, max_context_tokens=1234)
+    loader.load_config()
+    (user_dir / "config.cache.pkl").write_bytes(b"not a pickle")
+
+    monkeypatch.setattr(loader, "_cached_config", None)
+    assert loader.load_config().max_context_tokens == 1234
+
+
+def test_save_config_round_trip(user_dir):
+    user_dir.mkdir(parents=True, exist_ok=True)
+    config = AppConfig(max_context_tokens=4321, window_geometry=b"01ab")
+    loader.save_config(config)
+
+    loaded = loader.load_config()
+    assert loaded.max_context_tokens == 4321
+    assert loaded.window_geometry == b"01ab"
+
+
+def test_load_config_backs_up_corrupt_file(user_dir):
+    config_path = _write_user_config(user_dir)
+    config_path.write_text("{not json", encoding="utf-8")
+
+    config = loader.load_config()
+    assert config.max_context_tokens == AppConfig().max_context_tokens
+    assert not config_path.exists()
+    assert (user_dir / "config.json.corrupted").exists()
+    assert not (user_dir / "config.cache.pkl").exists()
+
+
+def test_load_config_defaults_without_user_config(user_dir):
+    assert loader.load_config().max_context_tokens == AppConfig().max_context_tokens
+
+
+def test_load_config_non_object_json_falls_back_to_defaults(user_dir):
+    config_path = _write_user_config(user_dir)
+    config_path.write_text("[1, 2, 3]", encoding="utf-8")
+    assert loader.load_config().max_context_tokens == AppConfig().max_context_tokens
+
+
+def test_save_config_skips_unchanged_file(user_dir, monkeypatch):
+    config_path = _write_user_config(user_dir, max_context_tokens=1234)
+    config = loader.load_config()
+    loader.save_config(config)
+    assert json.loads(config_path.read_text(encoding="utf-8"))["max_context_tokens"] == 1234
+
+    with monkeypatch.context() as m:
+        m.setattr(loader.os, "replace", lambda *a: pytest.fail("unchanged config was rewritten"))
+        loader.save_config(config)
+
+    config.max_context_tokens = 4321
+    loader.save_config(config)
+    assert json.loads(config_path.read_text(encoding="utf-8"))["max_context_tokens"] == 4321
+
+
+def test_save_config_keeps_the_existing_file_format(user_dir, monkeypatch):
+    user_dir.mkdir(parents=True)
+    config_path = user_dir / "config.json"
+    config_path.write_text(AppConfig(common_questions=["Qu'est-ce que ça fait ?"]).model_dump_json(indent=4), encoding="utf-8")
+    config = loader.load_config()
+    monkeypatch.setattr(loader.os, "replace", lambda *a: pytest.fail("unchanged config was rewritten"))
+    loader.save_config(config)
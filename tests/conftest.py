@@ -0,0 +1,11 @@
+# tests/conftest.py
+import pytest
+
+from promptbuilder.core import token_cache
+
+
+@pytest.fixture(autouse=True)
+def _no_user_token_cache(monkeypatch):
+    # Keep tests out of the real user data dir; cache tests build their own TokenCountCache
+    monkeypatch.setattr(token_cache, "_cache", None)
+    monkeypatch.setattr(token_cache, "_cache_failed", True)
@@ -0,0 +1,38 @@
+# tests/core/test_plugins.py
+import time
+
+from promptbuilder.core import plugins
+from promptbuilder.core.plugins import ContextProvider
+
+
+def _provider(provider_name):
+    class Provider(ContextProvider):
+        name = provider_name
+        def get_context(self, options=None): return None
+    return Provider
+
+
+class _EntryPoint:
+    def __init__(self, name, load):
+        self.name = name; self.load = load
+
+
+def test_load_plugins_registers_in_entry_point_order(monkeypatch):
+    first, dup = _provider("first"), _provider("first")
+    def slow_load(): time.sleep(0.05); return first
+    def broken_load(): raise ImportError("boom")
+    eps = [_EntryPoint("a", slow_load), _EntryPoint("b", broken_load),
+           _EntryPoint("c", lambda: dup), _EntryPoint("d", lambda: int)]
+    monkeypatch.setattr(plugins, "_plugin_registry", {})
+    monkeypatch.setattr(plugins.importlib.metadata, "entry_points", lambda group: eps)
+
+    plugins.load_plugins()
+    # The slow first entry point still wins the name; the duplicate, the failure and the non-provider are skipped
+    assert plugins.get_available_providers() == [first]
+
+
+def test_register_plugin_returns_the_class(monkeypatch):
+    monkeypatch.setattr(plugins, "_plugin_registry", {})
+    provider = _provider("decorated")
+    assert plugins.register_plugin(provider) is provider
+    assert plugins.get_available_providers() == [provider]
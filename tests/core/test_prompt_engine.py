@@ -0,0 +1,30 @@
+# tests/core/test_prompt_engine.py
+from promptbuilder.config.schema import AppConfig, SnippetCategory
+from promptbuilder.core import prompt_engine
+
+
+def test_build_instructions_xml_orders_categories_and_indents(monkeypatch):
+    config = AppConfig(prompt_snippets={
+        "Code Style": SnippetCategory(items={"Short": "Keep it short.", "Empty": "", "Custom": ""}),
+        "Objective": SnippetCategory(items={"Review": "Review it."}),
+    })
+    monkeypatch.setattr(prompt_engine, "get_config", lambda: config)
+    engine = prompt_engine.PromptEngine()
+    xml = engine.build_instructions_xml(
+        {"Objective": {"Review": None}, "Code Style": {"Custom": "line one\nline two", "Short": None, "Empty": None, "Missing": None}},
+        {config.common_questions[0]},
+    )
+    assert xml == "\n".join([
+        "<instructions>",
+        "    <code_style>",
+        "        line one\n        line two",
+        "        Keep it short.",
+        "    </code_style>",
+        "    <objective>",
+        "        Review it.",
+        "    </objective>",
+        "    <questions>",
+        f"        {config.common_questions[0]}",
+        "    </questions>",
+        "</instructions>",
+    ])
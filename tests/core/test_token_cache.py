@@ -0,0 +1,61 @@
+# tests/core/test_token_cache.py
+from promptbuilder.core import token_cache
+from promptbuilder.core.token_cache import TokenCountCache
+
+
+def test_count_batch_only_tokenizes_unseen_texts(tmp_path, monkeypatch):
+    counted = []
+    def fake_batch(texts, encoding_name):
+        counted.extend(texts); return [len(t) for t in texts]
+    monkeypatch.setattr(token_cache, "count_tokens_batch_sync", fake_batch)
+
+    cache = TokenCountCache(tmp_path / "tokens.db")
+    assert cache.count_batch(["aa", "bbb", "aa"]) == [2, 3, 2]
+    assert counted == ["aa", "bbb"] # Duplicates are tokenized once
+    cache.close()
+
+    counted.clear()
+    reopened = TokenCountCache(tmp_path / "tokens.db") # Persisted across connections
+    assert reopened.count_batch(["bbb", "cccc", "aa"]) == [3, 4, 2]
+    assert counted == ["cccc"]
+    assert reopened.count_batch(["aa"], encoding_name="gpt2") == [2] # Counts are per encoding
+    assert counted == ["cccc", "aa"]
+    reopened.close()
+
+
+def test_store_commits_the_batch_once(tmp_path):
+    cache = TokenCountCache(tmp_path / "tokens.db")
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+    cache._store({bytes([i]) * 16: i for i in range(5)}, [], "cl100k_base")
+    assert [s for s in statements if s.split()[0] in ("BEGIN", "COMMIT", "ROLLBACK")] == ["BEGIN", "COMMIT"]
+    assert cache._lookup([bytes([i]) * 16 for i in range(5)], "cl100k_base") == {bytes([i]) * 16: i for i in range(5)}
+    cache.close()
+
+
+def test_least_recently_used_rows_are_pruned_on_open(tmp_path, monkeypatch):
+    monkeypatch.setattr(token_cache, "count_tokens_batch_sync", lambda texts, encoding_name: [len(t) for t in texts])
+    cache = TokenCountCache(tmp_path / "tokens.db")
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+    cache.count_batch(texts)
+    for age, text in enumerate(texts): # "a" is the most recently used
+        cache._conn.execute("UPDATE tokens SET used = used - ? WHERE digest = ?", (age * 10 * token_cache._TOUCH_INTERVAL, token_cache._content_digest(text)))
+    cache.count_batch(["eeeee"]) # A stale hit counts as a use
+    cache.close()
+
+    monkeypatch.setattr(TokenCountCache, "MAX_ROWS", 3)
+    reopened = TokenCountCache(tmp_path / "tokens.db")
+    assert reopened._lookup([token_cache._content_digest(t) for t in texts], "cl100k_base") == \
+        {token_cache._content_digest(t): len(t) for t in ("a", "bb", "eeeee")}
+    reopened.close()
+
+
+def test_cache_from_an_older_schema_is_rebuilt(tmp_path):
+    import sqlite3
+    conn = sqlite3.connect(tmp_path / "tokens.db")
+    conn.execute("CREATE TABLE tokens (digest BLOB NOT NULL, encoding TEXT NOT NULL, tokens INTEGER NOT NULL, "
+                 "PRIMARY KEY (digest, encoding)) WITHOUT ROWID")
+    conn.execute("INSERT INTO tokens VALUES (x'00', 'cl100k_base', 1)"); conn.commit(); conn.close()
+    cache = TokenCountCache(tmp_path / "tokens.db")
+    assert cache._lookup([b"\x00"], "cl100k_base") == {}
+    cache.close()
@@ -1,7 +1,7 @@
 # tests/test_token_counter.py
 import pytest
 # Fixes critical issue #1 & #3: Use alias, use range assertions
-from promptbuilder.core.token_counter import count_tokens, TIKTOKEN_AVAILABLE, DEFAULT_ENCODING
+from promptbuilder.core.token_counter import count_tokens, count_tokens_batch, TIKTOKEN_AVAILABLE, DEFAULT_ENCODING
 
 # Skip all tests in this module if tiktoken is not available
 pytestmark = pytest.mark.skipif(not TIKTOKEN_AVAILABLE, reason="tiktoken library not installed or failed to load")
@@ -51,4 +51,9 @@ def test_count_tokens_estimation_fallback(mocker):
     assert count_tokens(text) == expected_estimation
 
     # Test estimation for empty string with fallback
-    assert count_tokens("") == 0
\ No newline at end of file
+    assert count_tokens("") == 0
+
+
+def test_count_tokens_batch_matches_single_counts():
+    texts = ["hello world", "", "<file name='x'>code</file>", "a longer sentence " * 50]
+    assert count_tokens_batch(texts) == [count_tokens(t) for t in texts]
@@ -0,0 +1,67 @@
+# tests/plugins/test_git_diff.py
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from promptbuilder.plugins import git_diff
+from promptbuilder.plugins.git_diff import GitDiffProvider
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git not installed")
+
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(["git", *args], cwd=repo, check=True, capture_output=True)
+
+
+def test_diff_context_is_escaped_xml(tmp_path):
+    repo = tmp_path / "it's <mine>"; repo.mkdir()
+    _git(repo, "init", "-q")
+    (repo / "a.py").write_text("x = 1\n", encoding="utf-8")
+    _git(repo, "add", "a.py")
+    _git(repo, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+    (repo / "a.py").write_text("if a < b && c > 'd':\n    pass\n", encoding="utf-8")
+
+    result = GitDiffProvider().get_context({"repo_path": str(repo)})
+    xml = result.context_xml
+    assert xml.startswith("<context>\n    <file name='git_diff_unstaged.diff' path='")
+    assert "it&#x27;s &lt;mine&gt;' status='generated' tokens='" in xml
+    assert "+if a &lt; b &amp;&amp; c &gt; 'd':" in xml
+    assert xml.endswith("\n    </file>\n</context>")
+    assert result.total_tokens == result.included_files[0].tokens > 0
+
+
+def test_diff_larger_than_max_bytes_is_truncated(tmp_path):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "a.txt").write_text("", encoding="utf-8")
+    _git(tmp_path, "add", "a.txt")
+    _git(tmp_path, "-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", "init")
+    (tmp_path / "a.txt").write_text("é line\r\n" * 50_000, encoding="utf-8")
+
+    diff = GitDiffProvider().get_context({"repo_path": str(tmp_path), "max_bytes": 1001}).included_files[0].content
+    assert diff.endswith("\n... [truncated]")
+    body = diff[:-len("\n... [truncated]")]
+    assert len(body.encode("utf-8")) <= 1001 and "\r" not in body and "�" not in body
+
+
+def test_staged_diff_is_reused_until_index_changes(tmp_path, monkeypatch):
+    _git(tmp_path, "init", "-q")
+    (tmp_path / "a.py").write_text("x = 1\n", encoding="utf-8")
+    _git(tmp_path, "add", "a.py")
+    options = {"repo_path": str(tmp_path), "staged": True}
+    first = GitDiffProvider().get_context(options)
+    assert "+x = 1" in first.context_xml
+
+    popen = git_diff.subprocess.Popen
+    def no_diff(cmd, *args, **kwargs):
+        assert cmd[:2] != ["git", "diff"], "git diff re-run"
+        return popen(cmd, *args, **kwargs)
+    monkeypatch.setattr(git_diff.subprocess, "Popen", no_diff)
+    again = GitDiffProvider().get_context(options)
+    assert again.context_xml == first.context_xml and again.included_files is not first.included_files
+
+    monkeypatch.setattr(git_diff.subprocess, "Popen", popen)
+    (tmp_path / "a.py").write_text("x = 2\n", encoding="utf-8")
+    _git(tmp_path, "add", "a.py")
+    assert "+x = 2" in GitDiffProvider().get_context(options).context_xml
@@ -0,0 +1,134 @@
+# tests/test_cli.py
+from pathlib import Path
+
+import pytest
+
+from promptbuilder.cli import _filter_nodes, _collect_paths_from_nodes
+from promptbuilder.core.fs_scanner import _FileScannerCore
+
+
+@pytest.fixture
+def repo(tmp_path: Path) -> Path:
+    files = [
+        "setup.py",
+        "readme.md",
+        "src/app.py",
+        "src/util.py",
+        "src/test_app.py",
+        "src/pkg/core.py",
+        "docs/index.md",
+    ]
+    for rel in files:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"# {rel}\n", encoding="utf-8")
+    return tmp_path.resolve()
+
+
+def _scan(root: Path):
+    root_nodes = _FileScannerCore(root_path=root, ignore_patterns=[]).scan_directory_sync()
+    return root_nodes[0].children
+
+
+def _rel_names(nodes, root: Path):
+    return {n.path.relative_to(root).as_posix() for n in nodes}
+
+
+def test_filter_nodes_no_patterns_returns_input(repo):
+    nodes = _scan(repo)
+    assert _filter_nodes(nodes, repo, None, None) is nodes
+
+
+def test_filter_nodes_include_keeps_matches_and_ancestors(repo):
+    kept = _filter_nodes(_scan(repo), repo, ["src/pkg/*.py"], None)
+    assert _rel_names(kept, repo) == {"src", "src/pkg", "src/pkg/core.py"}
+
+
+def test_filter_nodes_include_matches_basename(repo):
+    kept = _filter_nodes(_scan(repo), repo, ["*.md"], None)
+    assert _rel_names(kept, repo) == {"readme.md", "docs", "docs/index.md"}
+
+
+def test_filter_nodes_exclude_prunes_subtree(repo):
+    kept = _filter_nodes(_scan(repo), repo, None, ["src"])
+    names = _rel_names(kept, repo)
+    assert not any(name.startswith("src") for name in names)
+    assert {"setup.py", "readme.md", "docs", "docs/index.md"} <= names
+
+
+def test_filter_nodes_exclude_applies_after_include(repo):
+    kept = _filter_nodes(_scan(repo), repo, ["*.py"], ["test_*"])
+    names = _rel_names(kept, repo)
+    assert "src/test_app.py" not in names
+    assert {"setup.py", "src/app.py", "src/pkg/core.py"} <= names
+
+
+def test_collect_paths_from_nodes_returns_files_only(repo):
+    paths = _collect_paths_from_nodes(_scan(repo))
+    assert all(p.is_file() for p in paths)
+    assert len(paths) == 7
+
+
+def _select(root: Path, include, exclude):
+    """Mirrors cli.build: scan with the globs, filter, then collect leaf files."""
+    scanner = _FileScannerCore(root_path=root, ignore_patterns=[],
+                               include_patterns=include, exclude_patterns=exclude)
+    nodes = scanner.scan_directory_sync()[0].children
+    kept = _filter_nodes(nodes, root, include, exclude)
+    return {p.relative_to(root).as_posix() for p in _collect_paths_from_nodes(kept)}
+
+
+def test_select_include_basename_glob(repo):
+    assert _select(repo, ["*.py"], None) == {
+        "setup.py", "src/app.py", "src/util.py", "src/test_app.py", "src/pkg/core.py",
+    }
+
+
+def test_select_exclude_does_not_leak_through_kept_parent(repo):
+    assert _select(repo, ["*.py"], ["test_*"]) == {
+        "setup.py", "src/app.py", "src/util.py", "src/pkg/core.py",
+    }
+
+
+def test_select_include_path_glob_prunes_siblings(repo):
+    assert _select(repo, ["src/pkg/*"], None) == {"src/pkg/core.py"}
+
+
+def test_select_included_directory_keeps_its_files(repo):
+    assert _select(repo, ["docs"], None) == {"docs/index.md"}
+
+
+def test_scanner_prunes_excluded_directories(repo):
+    scanner = _FileScannerCore(root_path=repo, ignore_patterns=[], exclude_patterns=["src"])
+    children = scanner.scan_directory_sync()[0].children
+    assert "src" not in {c.name for c in children}
+
+
+def test_basename_globs_do_not_match_across_directories(repo):
+    # "s*y.py" would match "src/util.py" as a path; basename globs only see "util.py"
+    assert _filter_nodes(_scan(repo), repo, ["s*y.py"], None) == []
+    assert _select(repo, ["s*.py"], None) == {"setup.py"}
+
+
+def test_scanner_ignore_patterns_and_directory_only_patterns(repo):
+    (repo / "build").write_text("a file named build\n", encoding="utf-8")
+    (repo / "docs" / "build").mkdir()
+    (repo / "docs" / "build" / "out.md").write_text("x\n", encoding="utf-8")
+    scanner = _FileScannerCore(root_path=repo, ignore_patterns=["build/", "test_*", "src/pkg"])
+    paths = {p.relative_to(repo).as_posix() for p in _collect_paths_from_nodes(scanner.scan_directory_sync()[0].children)}
+    assert paths == {"setup.py", "readme.md", "build", "src/app.py", "src/util.py", "docs/index.md"}
+
+
+def test_build_drains_the_log_queue_on_error_exit(repo, tmp_path, monkeypatch):
+    from typer.testing import CliRunner
+    from promptbuilder import cli
+    from promptbuilder.config.schema import AppConfig
+    monkeypatch.setattr(cli, "setup_logging", lambda **kwargs: None)
+    monkeypatch.setattr(cli, "get_config", AppConfig)
+    completed = []
+    monkeypatch.setattr(cli.logger, "complete", lambda: completed.append(True))
+
+    result = CliRunner().invoke(cli.app, ["build", "--repo", str(repo), "--include", "*.nothing",
+                                          "--output", str(tmp_path / "out.xml")])
+    assert result.exit_code == 1
+    assert completed == [True]
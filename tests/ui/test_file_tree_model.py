@@ -0,0 +1,69 @@
+# tests/ui/test_file_tree_model.py
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PySide6")
+from PySide6.QtCore import Qt
+
+from promptbuilder.core.models import FileNode
+from promptbuilder.ui.widgets.file_tree import FileTreeModel
+
+
+def _node(path, parent=None, is_dir=False):
+    node = FileNode(path=Path(path), name=Path(path).name, is_dir=is_dir, parent=parent)
+    if parent is not None: parent.children.append(node)
+    return node
+
+
+def _tree():
+    root = _node("/r", is_dir=True); pkg = _node("/r/pkg", root, is_dir=True)
+    files = [_node(f"/r/pkg/{n}.py", pkg) for n in "abc"]
+    return root, pkg, files
+
+
+def test_ancestors_follow_their_children():
+    root, pkg, files = _tree()
+    model = FileTreeModel(); model.set_root(root)
+
+    model.set_check_state(files[0], Qt.CheckState.Checked)
+    assert model.check_state(pkg) == model.check_state(root) == Qt.CheckState.PartiallyChecked
+
+    for f in files[1:]: model.set_check_state(f, Qt.CheckState.Checked)
+    assert model.check_state(pkg) == model.check_state(root) == Qt.CheckState.Checked
+
+    model.set_check_state(pkg, Qt.CheckState.Unchecked)
+    assert model.checked_nodes() == {}
+
+
+def test_checking_a_directory_checks_its_subtree():
+    root, pkg, files = _tree()
+    model = FileTreeModel(); model.set_root(root)
+    model.set_check_state(pkg, Qt.CheckState.Checked)
+    assert all(model.check_state(f) == Qt.CheckState.Checked for f in files)
+    assert model.check_state(root) == Qt.CheckState.Checked
+    assert model.checked_file_paths() == {f.path for f in files}
+    model.set_check_state(files[1], Qt.CheckState.Unchecked)
+    assert model.checked_file_paths() == {files[0].path, files[2].path}
+    model.clear_check_states()
+    assert model.checked_file_paths() == set()
+
+
+def test_rechecking_only_touches_rows_that_change():
+    root, pkg, files = _tree()
+    model = FileTreeModel(); model.set_root(root)
+    model.set_check_state(pkg, Qt.CheckState.Checked)
+    model.set_check_state(files[0], Qt.CheckState.Unchecked)
+    changed = []
+    model.dataChanged.connect(lambda top, bottom, roles: changed.append((top.row(), bottom.row())))
+    model.set_check_state(root, Qt.CheckState.Checked)
+    assert model.checked_file_paths() == {f.path for f in files}
+    assert (0, 2) in changed # pkg's children, since files[0] changed
+    model.set_check_state(pkg, Qt.CheckState.Checked); changed.clear()
+    model.set_check_state(root, Qt.CheckState.Checked)
+    assert changed == [(0, 0)] # Only the root row itself
+
+
+def test_format_size_units():
+    fmt = FileTreeModel._format_size
+    assert [fmt(n) for n in (0, 1023, 1024, 1536, 5 * 1024**2, 3 * 1024**3 // 2)] == ["0 B", "1023 B", "1.0 KB", "1.5 KB", "5.0 MB", "1.5 GB"]
@@ -0,0 +1,16 @@
+# tests/ui/test_text_edit.py
+import pytest
+
+pytest.importorskip("PySide6")
+from promptbuilder.ui.widgets.text_edit import _common_prefix_len, _common_suffix_len
+
+
+@pytest.mark.parametrize("old, new, prefix, suffix", [
+    ("", "abc", 0, 0),
+    ("same", "same", 4, 0),
+    ("<i>a</i>\nbody", "<i>ab</i>\nbody", 4, 9),
+    ("aaa", "aaaa", 3, 0), # Suffix limited to what the prefix left over
+])
+def test_common_prefix_and_suffix(old, new, prefix, suffix):
+    assert _common_prefix_len(old, new) == prefix
+    assert _common_suffix_len(old, new, min(len(old), len(new)) - prefix) == suffix